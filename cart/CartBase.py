@@ -1,11 +1,15 @@
 import logging
 from abc import abstractmethod, ABC
 
-from django.db.models import Sum
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
 from django.http import HttpRequest
 from typing import Any, Dict
 
+from cart.constants import CART_ITEM_FIELDS, CART_OP_ADD, CART_OP_UPDATE
 from cart.models import Cart
+from cart.summary import CartSummaryService
+from djangoProject.versions import UserStateVersion
 from cart.exceptions import CartOperationError
 from myapp.models import Product
 
@@ -35,6 +39,14 @@ class CartInterface(ABC):
     def get_cart_items(self, *args: Any, **kwargs: Any) -> int:
         pass
 
+    @abstractmethod
+    def get_cart_summary(self, *args: Any, **kwargs: Any) -> Dict[str, Any]:
+        pass
+
+    @abstractmethod
+    def apply_operations(self, *args: Any, **kwargs: Any) -> Dict[str, Any]:
+        pass
+
     @abstractmethod
     def clear_cart(self, *args: Any, **kwargs: Any) -> Dict[str, Any]:
         pass
@@ -43,6 +55,10 @@ class CartInterface(ABC):
     def save_cart(self, *args: Any, **kwargs: Any) -> Dict[str, Any]:
         pass
 
+    @abstractmethod
+    def get_version(self, *args: Any, **kwargs: Any) -> Any:
+        pass
+
 
 class CartCalculatorMixin:
     """Mixin for centralized cart calculation logic"""
@@ -61,6 +77,46 @@ class CartCalculatorMixin:
             'name': product.name
         }
 
+    @staticmethod
+    def _fold_operations(quantities, operations, known_products):
+        """
+        Applies ordered cart operations to a {product_id: quantity} mapping in place.
+        Removed products and products dropping to zero end up with quantity 0.
+        :param quantities: Current quantities of the products in the cart.
+        :param operations: List of (action, product_id, amount) tuples.
+        :param known_products: Ids of products that exist and can be added.
+        :return: Indexes of the operations skipped: unknown product or product not in the cart.
+        """
+        skipped = []
+        for index, (action, product_id, amount) in enumerate(operations):
+            current = quantities.get(product_id, 0)
+            if action == CART_OP_ADD:
+                if product_id not in known_products:
+                    skipped.append(index)
+                    continue
+                quantities[product_id] = current + amount
+            elif current <= 0:
+                skipped.append(index)
+            elif action == CART_OP_UPDATE:
+                quantities[product_id] = max(current + amount, 0)
+            else:
+                quantities[product_id] = 0
+        return skipped
+
+    @staticmethod
+    def _batch_result(operations, quantities, skipped, summary, in_db):
+        """Final state of a batch: quantities of the touched products and the cart summary"""
+        touched = {product_id for _, product_id, _ in operations}
+        return {
+            'success': True,
+            'message': 'Cart updated',
+            'items': {str(product_id): max(quantities.get(product_id, 0), 0) for product_id in touched},
+            'skipped': skipped,
+            'cart_count': summary['cart_count'],
+            'total_price': summary['total_price'],
+            'in_db': in_db,
+        }
+
     @staticmethod
     def _calculate_total_price(cart_items):
         """Calculate total price from cart items list"""
@@ -73,24 +129,12 @@ class CartDB(CartInterface, CartCalculatorMixin):
         self._request = request
         self._user = request.user
 
-    def add_to_cart(self, product: Product):
+    def add_to_cart(self, product: Product, quantity: int = 1):
         """Add product to database cart"""
         try:
-            cart_item, created = Cart.objects.get_or_create(
-                user=self._user,
-                product=product,
-                defaults={'quantity': 0}
-            )
-
-            cart_item.quantity += 1
-            cart_item.save()
-
-            if created:
-                logger.info(f"Created new cart item: {cart_item}")
-            else:
-                logger.info(f"Updated existing cart item: {cart_item.quantity}")
-
-            cart_count = self.get_cart_count()
+            item_quantity, cart_count = self._add_quantity(product.id, quantity)
+            self._bump_version()
+            logger.info(f"Cart item {product.id} of user {self._user.id} now has quantity {item_quantity}")
 
             return {
                 'success': True,
@@ -104,29 +148,22 @@ class CartDB(CartInterface, CartCalculatorMixin):
             raise CartOperationError(f"Failed to add product to cart: {str(e)}") from e
 
     def update_quantity(self, product_id: int, quantity_change: int):
-        """Update product quantity"""
+        """Update product quantity, the item is removed when the quantity drops to zero"""
         try:
-            cart = Cart.objects.filter(user=self._user, product_id=product_id).first()
-            if not cart:
+            result = self._change_quantity(product_id, quantity_change)
+            if result is None:
                 return {
                     'success': False,
                     'message': 'Product not found in cart'
                 }
 
-            new_quantity = cart.quantity + quantity_change
-
-            if new_quantity <= 0:
-                cart.delete()
-                item_quantity = 0
-            else:
-                cart.quantity = new_quantity
-                cart.save()
-                item_quantity = new_quantity
+            item_quantity, cart_count = result
+            self._bump_version()
 
             return {
                 'success': True,
                 'message': 'Quantity updated',
-                'cart_count': self.get_cart_count(),
+                'cart_count': cart_count,
                 'item_quantity': item_quantity
             }
         except Exception as e:
@@ -135,66 +172,184 @@ class CartDB(CartInterface, CartCalculatorMixin):
 
     def remove_from_cart(self, product_id: int):
         try:
-            cart = Cart.objects.filter(user=self._user, product_id=product_id).first()
-
-            if cart is None:
-                return {
-                    'success': False,
-                    'message': 'Product not found in cart',
-                    'cart_count': self.get_cart_count(),
-                }
-
-            cart.delete()
-
-            cart_count = self.get_cart_count()
+            removed_quantity, cart_count = self._remove(product_id)
+        except Exception as e:
+            logger.error(f"Error removing from cart: {str(e)}")
+            raise CartOperationError(f"Failed to remove product from cart: {str(e)}") from e
 
-            return {
-                'success': True,
-                'message': 'Product removed from cart',
-                'cart_count': cart_count,
-            }
-        except Cart.DoesNotExist:
+        if not removed_quantity:
             logger.warning(f"Product {product_id} not found in cart for user {self._user}")
             return {
                 'success': False,
                 'message': 'Product not found in cart',
+                'cart_count': cart_count,
             }
 
+        self._bump_version()
+        return {
+            'success': True,
+            'message': 'Product removed from cart',
+            'cart_count': cart_count,
+        }
+
+    # Atomic mutations. On PostgreSQL the cart change is a single statement that also returns
+    # the new cart count: a data-modifying CTE sees the table as of the statement start, so the
+    # count is the sum over the other products plus the new quantity of this one. The change
+    # is applied to CartSummary in the same transaction.
+
+    def _add_quantity(self, product_id, quantity):
+        """
+        Adds quantity to a cart row, creating it when missing.
+        :return: (new item quantity, new cart count).
+        """
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'WITH upsert AS ('
+                        f'  INSERT INTO {self._table()} AS c (user_id, product_id, quantity) VALUES (%s, %s, %s)'
+                        f'  ON CONFLICT (user_id, product_id) DO UPDATE SET quantity = c.quantity + EXCLUDED.quantity'
+                        f'  RETURNING c.quantity'
+                        f') SELECT upsert.quantity, upsert.quantity + ({self._others_sum_sql()}) FROM upsert',
+                        [self._user.id, product_id, quantity, self._user.id, product_id],
+                    )
+                    item_quantity, cart_count = cursor.fetchone()
+            else:
+                items = Cart.objects.filter(user=self._user, product_id=product_id)
+                if not items.update(quantity=F('quantity') + quantity):
+                    try:
+                        with transaction.atomic():
+                            Cart.objects.create(user=self._user, product_id=product_id, quantity=quantity)
+                    except IntegrityError:
+                        # Created concurrently, the unique constraint turns the race into an increment
+                        items.update(quantity=F('quantity') + quantity)
+                item_quantity = items.values_list('quantity', flat=True).get()
+                cart_count = None
+
+            # Rows never hold zero, so the row is new when it holds exactly what was added.
+            # The price is read by the UPDATE itself: a reprice committed since the caller loaded the
+            # product has already rebuilt the summary, a delta at the old price would drift from it.
+            CartSummaryService.apply(
+                self._user.id, quantity, CartSummaryService.price_of(product_id) * quantity,
+                int(item_quantity == quantity),
+            )
+            if cart_count is None:
+                cart_count = self.get_cart_count()
+            return item_quantity, cart_count
+
+    def _change_quantity(self, product_id, quantity_change):
+        """
+        Changes the quantity of an existing cart row and deletes it when it drops to zero.
+        :return: (new item quantity, new cart count) or None if the product is not in the cart.
+        """
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'WITH changed AS ('
+                        f'  UPDATE {self._table()} SET quantity = quantity + %s'
+                        f'  WHERE user_id = %s AND product_id = %s RETURNING quantity'
+                        f') SELECT changed.quantity, GREATEST(changed.quantity, 0) + ({self._others_sum_sql()})'
+                        f' FROM changed',
+                        [quantity_change, self._user.id, product_id, self._user.id, product_id],
+                    )
+                    row = cursor.fetchone()
+                if row is None:
+                    return None
+                item_quantity, cart_count = row
+            else:
+                items = Cart.objects.filter(user=self._user, product_id=product_id)
+                if not items.update(quantity=F('quantity') + quantity_change):
+                    return None
+                item_quantity = items.values_list('quantity', flat=True).get()
+                cart_count = None
+
+            old_quantity = item_quantity - quantity_change
+            if item_quantity <= 0:
+                # The row stays locked by the UPDATE above until commit
+                Cart.objects.filter(user=self._user, product_id=product_id, quantity__lte=0).delete()
+                item_quantity = 0
+
+            count_delta = item_quantity - old_quantity
+            CartSummaryService.apply(
+                self._user.id, count_delta, CartSummaryService.price_of(product_id) * count_delta,
+                -1 if item_quantity == 0 else 0,
+            )
+            if cart_count is None:
+                cart_count = self.get_cart_count()
+            return item_quantity, cart_count
+
+    def _remove(self, product_id):
+        """
+        Deletes a cart row.
+        :return: (quantity of the deleted row or 0, new cart count).
+        """
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'WITH removed AS ('
+                        f'  DELETE FROM {self._table()} WHERE user_id = %s AND product_id = %s RETURNING quantity'
+                        f') SELECT COALESCE((SELECT quantity FROM removed), 0), ({self._others_sum_sql()})',
+                        [self._user.id, product_id, self._user.id, product_id],
+                    )
+                    removed_quantity, cart_count = cursor.fetchone()
+            else:
+                items = Cart.objects.select_for_update().filter(user=self._user, product_id=product_id)
+                removed_quantity = items.values_list('quantity', flat=True).first() or 0
+                items.delete()
+                cart_count = None
+
+            if removed_quantity:
+                CartSummaryService.apply(
+                    self._user.id, -removed_quantity, CartSummaryService.price_of(product_id) * -removed_quantity, -1,
+                )
+            if cart_count is None:
+                cart_count = self.get_cart_count()
+            return removed_quantity, cart_count
+
+    @staticmethod
+    def _table():
+        return connection.ops.quote_name(Cart._meta.db_table)
+
+    def _others_sum_sql(self):
+        """Cart count without one product, takes (user_id, product_id) parameters"""
+        return f'SELECT COALESCE(SUM(quantity), 0) FROM {self._table()} WHERE user_id = %s AND product_id <> %s'
+
     def get_cart_count(self):
-        """Get total items count from database"""
+        """Get total items count from the cart summary"""
         try:
-            result = Cart.objects.filter(user=self._user).aggregate(total=Sum('quantity'))
-            return result['total'] or 0
+            return CartSummaryService.get(self._user.id)['cart_count']
         except Exception as e:
             logger.error(e)
             return 0
 
     def get_cart_items(self):
-        """Get cart items for template from database"""
+        """
+        Get cart items for template from database.
+        One query loads just the product columns the cart needs, count and total are summed in Python.
+        """
         from decimal import Decimal
-        from django.db.models import F, Sum
         try:
-            cart = Cart.objects.filter(user=self._user).select_related('product')
-            cart_items = []
-
-            for cart_item in cart:
-                cart_items.append(
-                    self._build_cart_item(
-                        product=cart_item.product,
-                        quantity=cart_item.quantity,
-                        price=cart_item.product.price
-                    )
-                )
-
-            total_result = Cart.objects.filter(user=self._user).aggregate(
-                total=Sum(F('quantity') * F('product__price'))
+            cart = (
+                Cart.objects.filter(user=self._user)
+                .select_related('product')
+                .only(*CART_ITEM_FIELDS)
+                .order_by('id')
             )
-            total_price = total_result['total'] or Decimal('0.00')
+            cart_items = [
+                self._build_cart_item(
+                    product=cart_item.product,
+                    quantity=cart_item.quantity,
+                    price=cart_item.product.price
+                )
+                for cart_item in cart
+            ]
 
             return {
                 'cart_items': cart_items,
-                'total_price': total_price,
-                'cart_count': self.get_cart_count(),
+                'total_price': self._calculate_total_price(cart_items) or Decimal('0.00'),
+                'cart_count': sum(item['quantity'] for item in cart_items),
                 'in_db': True
             }
 
@@ -202,10 +357,21 @@ class CartDB(CartInterface, CartCalculatorMixin):
             logger.error(f"Error getting cart data from DB: {str(e)}")
             raise CartOperationError(f"Failed to get cart items: {str(e)}") from e
 
+    def get_cart_summary(self):
+        """Get items count and total price from the user's CartSummary row"""
+        try:
+            return CartSummaryService.get(self._user.id)
+        except Exception as e:
+            logger.error(f"Error getting cart summary from DB: {str(e)}")
+            raise CartOperationError(f"Failed to get cart summary: {str(e)}") from e
+
     def clear_cart(self):
         """Clear database cart"""
         try:
-            Cart.objects.filter(user=self._user).delete()
+            with transaction.atomic():
+                Cart.objects.filter(user=self._user).delete()
+                CartSummaryService.reset(self._user.id)
+            self._bump_version()
             logger.info("Cart cleared successfully")
             return {
                 'success': True,
@@ -230,8 +396,82 @@ class CartDB(CartInterface, CartCalculatorMixin):
             logger.error(f'Cart not saved to database: {str(e)}')
             raise CartOperationError(f"Failed to save cart: {str(e)}") from e
 
+    def apply_operations(self, operations):
+        """
+        Applies an ordered list of operations in one transaction.
+        The touched rows are locked and folded in memory, then written with one
+        delete, one bulk update and one bulk create.
+        :param operations: List of (action, product_id, amount) tuples.
+        :return: Final quantities of the touched products and the cart summary.
+        """
+        try:
+            try:
+                return self._apply_operations_once(operations)
+            except IntegrityError:
+                # A product missing from the cart cannot be locked, a concurrent add inserted it first.
+                # Retry once: the row exists now and is locked and folded like the others.
+                logger.info(f"Cart batch of user {self._user.id} raced with a concurrent add, retrying")
+                return self._apply_operations_once(operations)
+        except Exception as e:
+            logger.error(f"Error applying cart operations: {str(e)}")
+            raise CartOperationError(f"Failed to apply cart operations: {str(e)}") from e
+
+    def _apply_operations_once(self, operations):
+        with transaction.atomic():
+            product_ids = {product_id for _, product_id, _ in operations}
+            rows = {
+                item.product_id: item
+                for item in Cart.objects.select_for_update()
+                .filter(user=self._user, product_id__in=product_ids)
+                .only('id', 'product_id', 'quantity')
+            }
+            known_products = set(Product.objects.filter(id__in=product_ids).values_list('id', flat=True))
+
+            old_quantities = {product_id: item.quantity for product_id, item in rows.items()}
+            quantities = dict(old_quantities)
+            skipped = self._fold_operations(quantities, operations, known_products)
+
+            removed, changed, created = [], [], []
+            for product_id, quantity in quantities.items():
+                item = rows.get(product_id)
+                if item is None:
+                    if quantity > 0:
+                        created.append(Cart(user=self._user, product_id=product_id, quantity=quantity))
+                elif quantity <= 0:
+                    removed.append(item.id)
+                elif quantity != item.quantity:
+                    item.quantity = quantity
+                    changed.append(item)
+
+            if removed:
+                Cart.objects.filter(id__in=removed).delete()
+            if changed:
+                self.bulk_update_items(changed)
+            if created:
+                self.bulk_create_items(created)
+
+            count_deltas = {
+                product_id: max(quantity, 0) - old_quantities.get(product_id, 0)
+                for product_id, quantity in quantities.items()
+            }
+            if removed or changed or created:
+                # One bump once the rows are committed, a render in between must not pair the new ETag with old rows
+                transaction.on_commit(self._bump_version)
+                CartSummaryService.apply(
+                    self._user.id,
+                    sum(count_deltas.values()),
+                    sum(
+                        CartSummaryService.price_of(product_id) * delta
+                        for product_id, delta in count_deltas.items() if delta
+                    ),
+                    len(created) - len(removed),
+                )
+            summary = self.get_cart_summary()
+
+        return self._batch_result(operations, quantities, skipped, summary, in_db=True)
+
     def bulk_update_items(self, cart_items):
-        """Bulk update cart items quantities"""
+        """Bulk update cart items quantities, the caller applies the change to CartSummary and bumps the version"""
         try:
             Cart.objects.bulk_update(cart_items, ['quantity'])
             logger.info(f"Bulk updated {len(cart_items)} cart items")
@@ -240,14 +480,26 @@ class CartDB(CartInterface, CartCalculatorMixin):
             raise CartOperationError(f"Failed to bulk update cart items: {str(e)}") from e
 
     def bulk_create_items(self, cart_items):
-        """Bulk create new cart items"""
+        """
+        Bulk create new cart items, the caller applies the change to CartSummary and bumps the version.
+        IntegrityError (a row created concurrently) is left to the caller, which can retry.
+        """
         try:
             Cart.objects.bulk_create(cart_items)
             logger.info(f"Bulk created {len(cart_items)} cart items")
+        except IntegrityError:
+            raise
         except Exception as e:
             logger.error(f"Error bulk creating cart items: {str(e)}")
             raise CartOperationError(f"Failed to bulk create cart items: {str(e)}") from e
 
+    def get_version(self):
+        """Version of the user's cart, changes on every mutation"""
+        return UserStateVersion.get('cart', self._user.id)
+
+    def _bump_version(self):
+        UserStateVersion.bump('cart', self._user.id)
+
 
 class CartSyncService:
     """Service for synchronizing carts between session and database"""
@@ -257,9 +509,9 @@ class CartSyncService:
         """
         Synchronize cart items from session to database after user login.
         Transfers all items from CartSession to CartDB and clears the session cart.
+        The items go through CartDB.apply_operations: existing rows are locked and
+        incremented, new rows are created, and CartSummary is updated in the same transaction.
         """
-        from myapp.models import Product
-
         # Get session cart
         session_cart = CartSession(request)
         session_data = session_cart._cart
@@ -268,61 +520,29 @@ class CartSyncService:
             logger.info("No items in session cart to sync")
             return
 
-        # Get all product IDs from session
-        product_ids = [int(pid) for pid in session_data.keys()]
-
-        # ONE query to fetch all products
-        products = Product.objects.filter(id__in=product_ids)
-        products_dict = {product.id: product for product in products}
-
-        # ONE query to fetch all existing cart items for this user
-        existing_cart_items = Cart.objects.filter(
-            user=request.user,
-            product_id__in=product_ids
-        ).select_related('product')
-        existing_cart_dict = {item.product_id: item for item in existing_cart_items}
-
-        # Prepare cart items for bulk operations
-        cart_items_to_update = []
-        cart_items_to_create = []
-
-        for product_id_str, item_data in session_data.items():
-            product_id = int(product_id_str)
-            product = products_dict.get(product_id)
-
-            if not product:
-                logger.warning(f"Product {product_id} not found, skipping sync")
-                continue
-
-            quantity = item_data.get('quantity', 1)
-
-            # Check if item already exists in DB cart
-            existing_item = existing_cart_dict.get(product_id)
-            if existing_item:
-                # Update existing item
-                existing_item.quantity += quantity
-                cart_items_to_update.append(existing_item)
-            else:
-                # Create new item
-                cart_items_to_create.append(
-                    Cart(user=request.user, product=product, quantity=quantity)
-                )
-
-        # Use CartDB methods for bulk operations
-        db_cart = CartDB(request)
-        
-        if cart_items_to_update:
-            db_cart.bulk_update_items(cart_items_to_update)
+        operations = [
+            (CART_OP_ADD, int(product_id_str), item_data.get('quantity', 1))
+            for product_id_str, item_data in session_data.items()
+            if item_data.get('quantity', 1) > 0
+        ]
+        if not operations:
+            session_cart.clear_cart()
+            return
 
-        if cart_items_to_create:
-            db_cart.bulk_create_items(cart_items_to_create)
+        try:
+            result = CartDB(request).apply_operations(operations)
+        except CartOperationError as e:
+            # Login must not fail because of the cart, the session cart is kept for the next sync
+            logger.error(f"Failed to sync session cart of user {request.user.id}: {str(e)}")
+            return
 
-        synced_count = len(cart_items_to_update) + len(cart_items_to_create)
+        for index in result['skipped']:
+            logger.warning(f"Product {operations[index][1]} not found, skipping sync")
 
         # Clear session cart after successful sync
-        if synced_count > 0:
-            session_cart.clear_cart()
-            logger.info(f"Successfully synced {synced_count} items from session to DB cart")
+        session_cart.clear_cart()
+        synced_count = len(operations) - len(result['skipped'])
+        logger.info(f"Successfully synced {synced_count} items from session to DB cart")
 
 
 class CartSession(CartInterface, CartCalculatorMixin):
@@ -458,6 +678,55 @@ class CartSession(CartInterface, CartCalculatorMixin):
             logger.error(f"Error getting cart data from session: {str(e)}")
             raise CartOperationError(f"Failed to get cart items from session: {str(e)}") from e
 
+    def get_cart_summary(self):
+        """
+        Get items count and total price from the session alone.
+        Products deleted since they were added are still counted here,
+        get_cart_items drops them when the cart is rendered.
+        """
+        from decimal import Decimal
+        return {
+            'cart_count': self.get_cart_count(),
+            'total_price': sum(
+                (Decimal(item['price']) * item['quantity'] for item in self._cart.values()),
+                Decimal('0.00'),
+            ),
+        }
+
+    def apply_operations(self, operations):
+        """
+        Applies an ordered list of operations to the session cart and saves it once.
+        :param operations: List of (action, product_id, amount) tuples.
+        :return: Final quantities of the touched products and the cart summary.
+        """
+        try:
+            quantities = {int(product_id): item['quantity'] for product_id, item in self._cart.items()}
+            new_ids = {product_id for action, product_id, _ in operations if action == CART_OP_ADD} - quantities.keys()
+            products = Product.objects.in_bulk(new_ids) if new_ids else {}
+            skipped = self._fold_operations(quantities, operations, quantities.keys() | products.keys())
+
+            for product_id, quantity in quantities.items():
+                product_id_str = str(product_id)
+                if quantity <= 0:
+                    self._cart.pop(product_id_str, None)
+                elif product_id_str in self._cart:
+                    self._cart[product_id_str]['quantity'] = quantity
+                else:
+                    product = products[product_id]
+                    self._cart[product_id_str] = {
+                        'quantity': quantity,
+                        'price': str(product.price),
+                        'name': product.name,
+                        'image': product.image.url if product.image else ''
+                    }
+
+            self.save_cart()
+        except Exception as e:
+            logger.error(f"Error applying cart operations to session: {str(e)}")
+            raise CartOperationError(f"Failed to apply operations to session cart: {str(e)}") from e
+
+        return self._batch_result(operations, quantities, skipped, self.get_cart_summary(), in_db=False)
+
     def save_cart(self):
         """Save cart to session"""
         try:
@@ -472,6 +741,10 @@ class CartSession(CartInterface, CartCalculatorMixin):
             logger.error(f'Cart not saved to session: {str(e)}')
             raise CartOperationError(f"Failed to save cart to session: {str(e)}") from e
 
+    def get_version(self):
+        """Version of the session cart, a digest of its content"""
+        return UserStateVersion.digest(self._cart)
+
     def clear_cart(self):
         """Clear entire cart"""
         self._request.session['cart'] = {}
@@ -0,0 +1,22 @@
+"""
+Constants for the shopping cart
+"""
+
+# Columns loaded for cart pages and checkout: everything the cart template and order creation read
+CART_ITEM_FIELDS = (
+    'quantity',
+    'product__id',
+    'product__name',
+    'product__price',
+    'product__image',
+)
+
+# Batch endpoint: operation names and the largest accepted batch
+CART_OP_ADD = 'add'
+CART_OP_UPDATE = 'update'
+CART_OP_REMOVE = 'remove'
+CART_OPERATIONS = (CART_OP_ADD, CART_OP_UPDATE, CART_OP_REMOVE)
+CART_BATCH_MAX_OPERATIONS = 100
+
+# Users recomputed per query by CartSummaryService.rebuild
+CART_SUMMARY_REBUILD_BATCH_SIZE = 500
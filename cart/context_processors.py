@@ -1,9 +1,14 @@
+from django.utils.functional import SimpleLazyObject
+
 from .services import CartService
 
 def cart_context(request):
-    """Добавляет данные корзины в контекст всех шаблонов"""
-    cart_data = CartService.get_cart_items(request)
+    """
+    Добавляет данные корзины в контекст всех шаблонов.
+    Значения ленивые: запрос к БД выполняется, только если шаблон их читает,
+    и не более одного раза за запрос.
+    """
     return {
-        'cart_count': cart_data['cart_count'],
-        'cart_total_price': cart_data['total_price']
+        'cart_count': SimpleLazyObject(lambda: CartService.get_cart_summary(request)['cart_count']),
+        'cart_total_price': SimpleLazyObject(lambda: CartService.get_cart_summary(request)['total_price']),
     }
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from cart.constants import CART_SUMMARY_REBUILD_BATCH_SIZE
+from cart.summary import CartSummaryService
+
+
+class Command(BaseCommand):
+    help = "Recomputes cart summaries from the cart table and rewrites the ones that drifted"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids', help="Only this user, repeatable")
+        parser.add_argument('--batch-size', type=int, default=CART_SUMMARY_REBUILD_BATCH_SIZE, help="Users per query")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        repaired = CartSummaryService.rebuild(options['user_ids'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {repaired} cart summaries repaired in {time.monotonic() - started:.1f}s"
+        ))
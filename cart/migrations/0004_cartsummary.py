@@ -0,0 +1,43 @@
+# Generated by Django 5.1.2 on 2026-10-18 12:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+
+
+def fill_summaries(apps, schema_editor):
+    Cart = apps.get_model('cart', 'Cart')
+    CartSummary = apps.get_model('cart', 'CartSummary')
+    totals = (
+        Cart.objects.values('user_id')
+        .annotate(item_count=Sum('quantity'), total_price=Sum(F('quantity') * F('product__price')), line_count=Count('id'))
+        .order_by('user_id')
+    )
+    CartSummary.objects.bulk_create(
+        [CartSummary(version=1, **row) for row in totals.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0003_cart_user_product_uniq'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CartSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='cart_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('item_count', models.PositiveIntegerField(default=0)),
+                ('total_price', models.BigIntegerField(default=0)),
+                ('line_count', models.PositiveIntegerField(default=0)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(fill_summaries, migrations.RunPython.noop),
+    ]
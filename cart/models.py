@@ -9,5 +9,29 @@ class Cart(models.Model):
     quantity = models.IntegerField(default=1)
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            # One row per product, concurrent adds increment it instead of creating duplicates
+            models.UniqueConstraint(fields=['user', 'product'], name='cart_user_product_uniq'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} | {self.product.name} | {self.quantity}"
+
+
+class CartSummary(models.Model):
+    """
+    Denormalized totals of a user's database cart, read by the page chrome instead of
+    aggregating Cart. Maintained incrementally by CartDB mutations, repaired in bulk by
+    the repair_cart_summaries command.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='cart_summary')
+    item_count = models.PositiveIntegerField(default=0)
+    total_price = models.BigIntegerField(default=0)
+    line_count = models.PositiveIntegerField(default=0)
+    # Incremented on every change of the summary
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id} | {self.item_count} items | {self.total_price}"
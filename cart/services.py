@@ -3,7 +3,10 @@ import logging
 from django.http import HttpRequest, Http404
 
 from cart.CartFactory import CartFactory
+from cart.constants import CART_BATCH_MAX_OPERATIONS, CART_OP_ADD, CART_OP_UPDATE, CART_OPERATIONS
 from cart.exceptions import CartOperationError, ProductNotFoundError
+from djangoProject.exceptions import ValidationError
+from djangoProject.utils import forget_request_memo, peek_request_memo, request_memo
 from myapp.models import Product
 
 logger = logging.getLogger(__name__)
@@ -20,6 +23,7 @@ class CartService:
     def add_to_cart(request: HttpRequest, product_id: int):
         """Add product to cart"""
         cart_handler = CartFactory.build_cart(request)
+        CartService.forget(request)
         try:
             product = Product.objects.get(id=product_id)
         except Product.DoesNotExist:
@@ -44,6 +48,7 @@ class CartService:
     def remove_from_cart(request: HttpRequest, product_id: int):
         """Remove product from cart"""
         cart_handler = CartFactory.build_cart(request)
+        CartService.forget(request)
         try:
             return cart_handler.remove_from_cart(product_id)
         except CartOperationError as e:
@@ -58,6 +63,7 @@ class CartService:
     def update_quantity(request, product_id, quantity_change):
         """Update product quantity"""
         cart_handler = CartFactory.build_cart(request)
+        CartService.forget(request)
 
         try:
             return cart_handler.update_quantity(product_id, quantity_change)
@@ -69,9 +75,90 @@ class CartService:
                 'cart_count': cart_handler.get_cart_count(),
             }
 
+    @staticmethod
+    def apply_operations(request, raw_operations):
+        """
+        Apply a batch of cart operations in order and return the final cart state.
+        :param raw_operations: List of {'op': 'add'|'update'|'remove', 'product_id', 'quantity'|'quantity_change'}.
+        """
+        operations = CartService.parse_operations(raw_operations)
+        cart_handler = CartFactory.build_cart(request)
+        CartService.forget(request)
+        try:
+            return cart_handler.apply_operations(operations)
+        except CartOperationError as e:
+            logger.error(f"Error applying cart operations: {str(e)}")
+            return {
+                'success': False,
+                'message': 'Error updating cart',
+                'cart_count': cart_handler.get_cart_count(),
+            }
+
+    @staticmethod
+    def parse_operations(raw_operations):
+        """
+        Validate batch operations.
+        :return: List of (action, product_id, amount) tuples.
+        """
+        if not isinstance(raw_operations, list) or not raw_operations:
+            raise ValidationError("'operations' must be a non-empty list")
+        if len(raw_operations) > CART_BATCH_MAX_OPERATIONS:
+            raise ValidationError(f"A batch accepts at most {CART_BATCH_MAX_OPERATIONS} operations")
+
+        operations = []
+        for index, raw in enumerate(raw_operations):
+            try:
+                action = raw['op']
+                product_id = int(raw['product_id'])
+                if action == CART_OP_ADD:
+                    amount = int(raw.get('quantity', 1))
+                elif action == CART_OP_UPDATE:
+                    amount = int(raw['quantity_change'])
+                else:
+                    amount = 0
+            except (KeyError, TypeError, ValueError):
+                raise ValidationError("Invalid cart operation", details={'index': index})
+            if action not in CART_OPERATIONS or (action == CART_OP_ADD and amount < 1):
+                raise ValidationError("Invalid cart operation", details={'index': index})
+            operations.append((action, product_id, amount))
+        return operations
+
     @staticmethod
     def get_cart_items(request):
-        """Get cart data for template"""
+        """Get cart data for template, computed once per request"""
+        return request_memo(request, 'cart_items', lambda: CartService._load_cart_items(request))
+
+    @staticmethod
+    def get_cart_summary(request):
+        """
+        Get cart count and total price, computed once per request.
+        Reuses the cart items when the view already loaded them.
+        """
+        cart_data = peek_request_memo(request, 'cart_items')
+        if cart_data is not None:
+            return {'cart_count': cart_data['cart_count'], 'total_price': cart_data['total_price']}
+        return request_memo(request, 'cart_summary', lambda: CartService._load_cart_summary(request))
+
+    @staticmethod
+    def forget(request):
+        """Drop the cart data memoized for the request after a mutation"""
+        forget_request_memo(request, 'cart_items', 'cart_summary')
+
+    @staticmethod
+    def _load_cart_summary(request):
+        cart_handler = CartFactory.build_cart(request)
+        try:
+            return cart_handler.get_cart_summary()
+        except CartOperationError as e:
+            logger.error(f"Error getting cart summary: {str(e)}")
+            from decimal import Decimal
+            return {
+                'total_price': Decimal('0.00'),
+                'cart_count': 0,
+            }
+
+    @staticmethod
+    def _load_cart_items(request):
         cart_handler = CartFactory.build_cart(request)
         try:
             return cart_handler.get_cart_items()
@@ -83,3 +170,9 @@ class CartService:
                 'total_price': Decimal('0.00'),
                 'cart_count': 0,
             }
+
+    @staticmethod
+    def get_cart_version(request):
+        """Get cart version for conditional responses"""
+        cart_handler = CartFactory.build_cart(request)
+        return cart_handler.get_version()
@@ -0,0 +1,29 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from cart.models import Cart
+from cart.summary import CartSummaryService
+from myapp.models import Product
+
+
+@receiver(post_save, sender=Product)
+def product_price_changed(sender, instance, created, **kwargs):
+    """Cart summaries store totals at the current prices, recompute the ones holding a repriced product"""
+    loaded_price = getattr(instance, '_loaded_price', None)
+    instance._loaded_price = instance.price
+    if created or loaded_price == instance.price:
+        return
+    CartSummaryService.rebuild(list(Cart.objects.filter(product=instance).values_list('user_id', flat=True)))
+
+
+@receiver(pre_delete, sender=Product)
+def product_deleting(sender, instance, **kwargs):
+    # Cart rows are deleted by the cascade, remember whose summaries they belong to
+    instance._cart_user_ids = list(Cart.objects.filter(product=instance).values_list('user_id', flat=True))
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    user_ids = getattr(instance, '_cart_user_ids', None)
+    if user_ids:
+        CartSummaryService.rebuild(user_ids)
@@ -0,0 +1,135 @@
+import logging
+
+from django.db import transaction
+from django.db.models import Count, F, Subquery, Sum
+
+from cart.constants import CART_SUMMARY_REBUILD_BATCH_SIZE
+from cart.models import Cart, CartSummary
+from djangoProject.utils import batched
+from myapp.models import Product
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_FIELDS = ('item_count', 'total_price', 'line_count')
+
+
+class CartSummaryService:
+    """
+    Per-user cart totals stored in CartSummary.
+    Mutations apply their deltas with one F() UPDATE inside their own transaction.
+    A missing row is recomputed from Cart, so users the table has never seen are
+    filled in on first use.
+    """
+
+    @staticmethod
+    def get(user_id):
+        """
+        Reads the summary of a user's cart, one primary key lookup.
+        A user without a summary row gets totals computed from Cart.
+        :return: Dictionary with cart_count, total_price, line_count and version.
+        """
+        row = CartSummary.objects.filter(user_id=user_id).values_list(*SUMMARY_FIELDS, 'version').first()
+        if row is None:
+            # Reads never write: the first mutation or repair_cart_summaries fills the missing row
+            row = (*CartSummaryService._totals([user_id]).get(user_id, [0, 0, 0]), 0)
+        item_count, total_price, line_count, version = row
+        return {
+            'cart_count': item_count,
+            'total_price': total_price,
+            'line_count': line_count,
+            'version': version,
+        }
+
+    @staticmethod
+    def apply(user_id, count_delta, total_delta, line_delta=0):
+        """
+        Applies a change of the user's cart to its summary.
+        Must run in the transaction of the cart change, after it.
+        :param count_delta: Change of the number of items.
+        :param total_delta: Change of the total price, a number or an expression (see price_of).
+        :param line_delta: Change of the number of cart rows.
+        """
+        updated = CartSummary.objects.filter(user_id=user_id).update(
+            item_count=F('item_count') + count_delta,
+            total_price=F('total_price') + total_delta,
+            line_count=F('line_count') + line_delta,
+            version=F('version') + 1,
+        )
+        if not updated:
+            CartSummaryService.rebuild([user_id])
+
+    @staticmethod
+    def reset(user_id):
+        """Marks the user's cart as empty"""
+        CartSummary.objects.filter(user_id=user_id).update(
+            item_count=0, total_price=0, line_count=0, version=F('version') + 1,
+        )
+
+    @staticmethod
+    def price_of(product_id):
+        """Price of a product as a subquery, for deltas of mutations that do not load the product"""
+        return Subquery(Product.objects.filter(id=product_id).values('price')[:1])
+
+    @staticmethod
+    def rebuild(user_ids=None, batch_size=CART_SUMMARY_REBUILD_BATCH_SIZE):
+        """
+        Recomputes summaries from Cart and writes the ones that drifted.
+        :param user_ids: Users to rebuild, every user with a cart or a summary if None.
+        :param batch_size: Users recomputed per query.
+        :return: Number of summaries written.
+        """
+        if user_ids is None:
+            user_ids = Cart.objects.values_list('user_id', flat=True).union(
+                CartSummary.objects.values_list('user_id', flat=True)
+            )
+
+        written = 0
+        for batch in batched(user_ids, batch_size):
+            written += CartSummaryService._rebuild_batch(batch)
+        if written:
+            logger.info(f"Rebuilt {written} cart summaries")
+        return written
+
+    @staticmethod
+    def _totals(user_ids):
+        """Computes the summary values of the given users from Cart, users without rows are omitted"""
+        return {
+            user_id: values
+            for user_id, *values in Cart.objects.filter(user_id__in=user_ids)
+            .values('user_id')
+            .annotate(
+                item_count=Sum('quantity'),
+                total_price=Sum(F('quantity') * F('product__price')),
+                line_count=Count('id'),
+            )
+            .order_by()
+            .values_list('user_id', 'item_count', 'total_price', 'line_count')
+        }
+
+    @staticmethod
+    def _rebuild_batch(user_ids):
+        with transaction.atomic():
+            # Lock the summaries first: deltas of concurrent mutations then land on top of the recomputed totals
+            current = {
+                user_id: values
+                for user_id, *values in CartSummary.objects.select_for_update()
+                .filter(user_id__in=user_ids)
+                .values_list('user_id', *SUMMARY_FIELDS, 'version')
+            }
+            totals = CartSummaryService._totals(user_ids)
+
+            stale = []
+            for user_id in user_ids:
+                values = totals.get(user_id, [0, 0, 0])
+                *stored, version = current.get(user_id, [None, None, None, 0])
+                if stored != values:
+                    stale.append(CartSummary(user_id=user_id, **dict(zip(SUMMARY_FIELDS, values)), version=version + 1))
+
+            if stale:
+                CartSummary.objects.bulk_create(
+                    stale,
+                    update_conflicts=True,
+                    unique_fields=['user'],
+                    update_fields=[*SUMMARY_FIELDS, 'version', 'updated_at'],
+                )
+        return len(stale)
@@ -1,3 +1,130 @@
-from django.test import TestCase
+import threading
+import unittest
 
-# Create your tests here.
+from django.db import connection, connections
+from django.test import RequestFactory, TestCase, TransactionTestCase
+
+from cart.CartBase import CartDB
+from cart.constants import CART_OP_ADD
+from cart.models import Cart, CartSummary
+from myapp.models import Product
+from users.models import User
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', "Concurrent writers need PostgreSQL")
+class CartDBConcurrencyTest(TransactionTestCase):
+    """Parallel cart mutations must neither lose increments nor duplicate rows"""
+
+    threads = 8
+    clicks = 25
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', password='secret')
+        self.product = Product.objects.create(name='Phone', price=100, description='Phone')
+
+    def _cart(self):
+        request = RequestFactory().get('/')
+        request.user = self.user
+        return CartDB(request)
+
+    def _run_parallel(self, action):
+        barrier = threading.Barrier(self.threads)
+        errors = []
+
+        def worker():
+            try:
+                barrier.wait()
+                for _ in range(self.clicks):
+                    action(self._cart())
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        workers = [threading.Thread(target=worker) for _ in range(self.threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_parallel_adds_are_not_lost(self):
+        self._run_parallel(lambda cart: cart.add_to_cart(self.product))
+
+        rows = Cart.objects.filter(user=self.user, product=self.product)
+        self.assertEqual(rows.count(), 1)
+        self.assertEqual(rows.get().quantity, self.threads * self.clicks)
+        self.assertEqual(self._cart().get_cart_count(), self.threads * self.clicks)
+        self.assertSummaryMatchesCart()
+
+    def test_parallel_increments_and_decrements_balance(self):
+        self._cart().add_to_cart(self.product, quantity=self.threads * self.clicks)
+
+        def click(cart):
+            cart.update_quantity(self.product.id, 1)
+            cart.update_quantity(self.product.id, -1)
+
+        self._run_parallel(click)
+
+        self.assertEqual(Cart.objects.get(user=self.user, product=self.product).quantity, self.threads * self.clicks)
+        self.assertSummaryMatchesCart()
+
+    def test_parallel_batches_and_adds_are_not_lost(self):
+        def click(cart):
+            cart.apply_operations([(CART_OP_ADD, self.product.id, 1)])
+            cart.add_to_cart(self.product)
+
+        self._run_parallel(click)
+
+        self.assertEqual(Cart.objects.get(user=self.user, product=self.product).quantity, 2 * self.threads * self.clicks)
+        self.assertSummaryMatchesCart()
+
+    def test_mutations_return_new_cart_count(self):
+        other = Product.objects.create(name='Case', price=10, description='Case')
+        cart = self._cart()
+
+        self.assertEqual(cart.add_to_cart(self.product)['cart_count'], 1)
+        self.assertEqual(cart.add_to_cart(other, quantity=3)['cart_count'], 4)
+        self.assertEqual(cart.update_quantity(self.product.id, 2)['cart_count'], 6)
+
+        result = cart.update_quantity(other.id, -3)
+        self.assertEqual((result['item_quantity'], result['cart_count']), (0, 3))
+        self.assertFalse(Cart.objects.filter(product=other).exists())
+
+        self.assertSummaryMatchesCart()
+
+        self.assertEqual(cart.remove_from_cart(self.product.id)['cart_count'], 0)
+        self.assertFalse(cart.remove_from_cart(self.product.id)['success'])
+        self.assertSummaryMatchesCart()
+
+    def assertSummaryMatchesCart(self):
+        rows = Cart.objects.filter(user=self.user).select_related('product')
+        summary = CartSummary.objects.get(user=self.user)
+        self.assertEqual(
+            (summary.item_count, summary.total_price, summary.line_count),
+            (
+                sum(row.quantity for row in rows),
+                sum(row.quantity * row.product.price for row in rows),
+                len(rows),
+            ),
+        )
+
+
+class CartDBItemsQueryTest(TestCase):
+    def test_get_cart_items_is_one_query(self):
+        user = User.objects.create_user(username='buyer', password='secret')
+        for price in (100, 250, 40):
+            product = Product.objects.create(name=f'Product {price}', price=price, description='')
+            Cart.objects.create(user=user, product=product, quantity=2)
+        request = RequestFactory().get('/')
+        request.user = user
+
+        with self.assertNumQueries(1):
+            cart_data = CartDB(request).get_cart_items()
+            # Everything the cart template reads must already be loaded
+            for item in cart_data['cart_items']:
+                item['product'].id, item['product'].name, item['product'].price, item['product'].image_url
+
+        self.assertEqual(cart_data['cart_count'], 6)
+        self.assertEqual(cart_data['total_price'], 780)
+        self.assertEqual([item['quantity'] for item in cart_data['cart_items']], [2, 2, 2])
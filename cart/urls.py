@@ -14,6 +14,8 @@ urlpatterns = [
 
     path('delete/', views.cart_delete, name='cart_delete'),
 
+    path('batch/', views.cart_batch, name='cart_batch'),
+
     #path('count/', views.cart_count, name='cart_count'),
 
 
@@ -51,3 +51,13 @@ def cart_update(request):
 
     result = CartService.update_quantity(request, product_id, quantity_change)
     return JsonResponse(result)
+
+
+@handler_api_errors
+@require_POST
+def cart_batch(request):
+    """Handle an ordered batch of add/update/remove operations"""
+    data = parse_json_body(request)
+
+    result = CartService.apply_operations(request, data.get('operations'))
+    return JsonResponse(result)
@@ -4,7 +4,8 @@ from category.models import Category
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'description')  # Отображаемые поля в списке категорий
+    list_display = ('id', 'name', 'parent', 'depth', 'description')  # Отображаемые поля в списке категорий
     search_fields = ('name',)  # Поля, по которым можно искать
-    list_filter = ('name',)  # Возможность фильтровать по полям
-    ordering = ('id',)  # Сортировка по ID
+    list_filter = ('name', 'depth')  # Возможность фильтровать по полям
+    readonly_fields = ('path', 'depth')  # Путь пересчитывается при смене родителя
+    ordering = ('path',)  # Сортировка в порядке дерева
@@ -1,10 +1,57 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
+
+PATH_SEPARATOR = '/'
 
 
 class Category(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(max_length=500, blank=True, null=True)
+    parent = models.ForeignKey('self', on_delete=models.PROTECT, related_name='children', blank=True, null=True)
+    # Materialized path of ids from the root, e.g. '/1/5/12/'; a subtree is a single prefix range
+    path = models.CharField(max_length=255, default='', editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
 
     class Meta:
         verbose_name = 'Category'
         verbose_name_plural = 'Categories'
+        indexes = [
+            models.Index(fields=['path'], name='category_path_idx', opclasses=['varchar_pattern_ops']),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def clean(self):
+        if self.pk and self.parent_id and self.parent.is_descendant_of(self):
+            raise ValidationError({'parent': "A category cannot be moved into its own subtree"})
+
+    def is_descendant_of(self, other):
+        """True if this category is other or lies under it"""
+        return bool(other.path) and self.path.startswith(other.path)
+
+    def build_path(self):
+        parent_path = self.parent.path if self.parent_id else PATH_SEPARATOR
+        return f'{parent_path}{self.pk}{PATH_SEPARATOR}'
+
+    def save(self, *args, **kwargs):
+        """
+        Saves the category and keeps the materialized paths consistent.
+        Changing the parent rewrites the whole subtree with one UPDATE.
+        """
+        self.clean()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            path = self.build_path()
+            if path == self.path:
+                return
+
+            old_path, depth = self.path, path.count(PATH_SEPARATOR) - 2
+            subtree = Category.objects.filter(path__startswith=old_path) if old_path else Category.objects.filter(pk=self.pk)
+            subtree.update(
+                path=Concat(Value(path), Substr('path', len(old_path) + 1), output_field=models.CharField()),
+                depth=F('depth') + (depth - self.depth),
+            )
+            self.path, self.depth = path, depth
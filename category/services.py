@@ -0,0 +1,143 @@
+import logging
+from bisect import bisect_left, bisect_right
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as ModelValidationError
+from django.db import transaction
+
+from category.models import Category
+from djangoProject.exceptions import NotFoundError, ValidationError
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_MAP_CACHE_KEY = 'category:name_map'
+CATEGORY_TREE_CACHE_KEY = 'category:tree'
+
+
+class CategoryService:
+    @staticmethod
+    def get_name_map():
+        """
+        Returns a cached mapping of category name to the list of its ids.
+        :return: Dictionary {name: [id, ...]}.
+        """
+        name_map = cache.get(CATEGORY_MAP_CACHE_KEY)
+        if name_map is None:
+            name_map = {}
+            for category_id, name in Category.objects.values_list('id', 'name'):
+                name_map.setdefault(name, []).append(category_id)
+            cache.set(CATEGORY_MAP_CACHE_KEY, name_map, None)
+        return name_map
+
+    @staticmethod
+    def get_category_ids(name):
+        """Returns ids of the categories with the given name (empty list if unknown)"""
+        return CategoryService.get_name_map().get(name, [])
+
+    @staticmethod
+    def get_nodes():
+        """
+        Returns the cached category tree as a flat list ordered by materialized path.
+        The order is Python string order, which _subtree bisects on; the database
+        collation may ignore '/' and order paths differently.
+        :return: List of {'id', 'name', 'parent_id', 'path', 'depth'} dictionaries.
+        """
+        nodes = cache.get(CATEGORY_TREE_CACHE_KEY)
+        if nodes is None:
+            nodes = sorted(
+                Category.objects.values('id', 'name', 'parent_id', 'path', 'depth'),
+                key=lambda node: node['path'],
+            )
+            cache.set(CATEGORY_TREE_CACHE_KEY, nodes, None)
+        return nodes
+
+    @staticmethod
+    def get_tree():
+        """
+        Returns the category tree for navigation.
+        :return: List of root nodes, each with a nested 'children' list.
+        """
+        roots, by_id = [], {}
+        for node in CategoryService.get_nodes():
+            node = {**node, 'children': []}
+            by_id[node['id']] = node
+            parent = by_id.get(node['parent_id'])
+            (parent['children'] if parent else roots).append(node)
+        return roots
+
+    @staticmethod
+    def get_subtree_ids(name):
+        """Returns ids of the categories with the given name and all their descendants"""
+        nodes = CategoryService.get_nodes()
+        subtree_ids = set()
+        for node in nodes:
+            if node['name'] == name:
+                subtree_ids.update(CategoryService._subtree(nodes, node['path']))
+        return sorted(subtree_ids)
+
+    @staticmethod
+    def get_descendant_ids(category_id):
+        """Returns the id of the category and the ids of all its descendants"""
+        node = CategoryService.get_node(category_id)
+        return CategoryService._subtree(CategoryService.get_nodes(), node['path']) if node else []
+
+    @staticmethod
+    def get_lineage_ids(category_id):
+        """Returns the ids of the category and all its ancestors"""
+        node = CategoryService.get_node(category_id)
+        if node is None:
+            return [category_id]
+        return [int(part) for part in node['path'].strip('/').split('/')]
+
+    @staticmethod
+    def _subtree(nodes, path):
+        """Nodes are ordered by path, so a subtree is one contiguous range found by bisection"""
+        paths = [node['path'] for node in nodes]
+        start = bisect_left(paths, path)
+        end = bisect_right(paths, path + '\uffff')
+        return [nodes[i]['id'] for i in range(start, end)]
+
+    @staticmethod
+    def get_node(category_id):
+        """Returns the cached node of one category, None if it does not exist"""
+        return next((node for node in CategoryService.get_nodes() if node['id'] == category_id), None)
+
+    @staticmethod
+    def get_ancestors(category_id):
+        """Returns the ancestor nodes of the category from the root down, without a query"""
+        by_id = {node['id']: node for node in CategoryService.get_nodes()}
+        return [by_id[ancestor_id] for ancestor_id in CategoryService.get_lineage_ids(category_id)[:-1]
+                if ancestor_id in by_id]
+
+    @staticmethod
+    def move_to(category_id, parent_id=None):
+        """
+        Moves a category (with its subtree) under a new parent, or to the root.
+        The descendants' paths are renumbered with a single UPDATE.
+        :param category_id: Id of the category to move.
+        :param parent_id: Id of the new parent, None for the root.
+        :return: Moved category.
+        """
+        with transaction.atomic():
+            ids = [category_id] + ([parent_id] if parent_id is not None else [])
+            locked = {c.pk: c for c in Category.objects.select_for_update().filter(pk__in=ids)}
+            category = locked.get(category_id)
+            if category is None:
+                raise NotFoundError(f"Category {category_id} not found")
+            if parent_id is not None and parent_id not in locked:
+                raise NotFoundError(f"Category {parent_id} not found")
+
+            category.parent = locked.get(parent_id)
+            try:
+                category.save()
+            except ModelValidationError as e:
+                raise ValidationError("Invalid category move", details=e.message_dict)
+
+        logger.info(f"Category {category_id} moved under {parent_id}")
+        return category
+
+    @staticmethod
+    def invalidate():
+        """Drops the cached category map and tree"""
+        cache.delete_many([CATEGORY_MAP_CACHE_KEY, CATEGORY_TREE_CACHE_KEY])
+        logger.info("Category caches invalidated")
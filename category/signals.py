@@ -0,0 +1,20 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from category.models import Category
+from category.services import CategoryService
+from myapp.cache import CatalogVersion, CategoryVersion
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_cache(sender, **kwargs):
+    # After commit, otherwise another process may cache the old tree again with no timeout
+    transaction.on_commit(invalidate_category_tree)
+
+
+def invalidate_category_tree():
+    CategoryService.invalidate()
+    CatalogVersion.bump()
+    CategoryVersion.bump_tree()
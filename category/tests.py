@@ -1,3 +1,57 @@
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from category.models import Category
+from category.services import CategoryService
+from djangoProject.exceptions import ValidationError
+
+
+class CategoryTreeTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.electronics = Category.objects.create(name='Electronics')
+        self.phones = Category.objects.create(name='Phones', parent=self.electronics)
+        self.smartphones = Category.objects.create(name='Smartphones', parent=self.phones)
+        self.cases = Category.objects.create(name='Cases', parent=self.smartphones)
+        self.home = Category.objects.create(name='Home')
+
+    def assertPath(self, category, *lineage):
+        category.refresh_from_db()
+        self.assertEqual(category.path, '/' + ''.join(f'{ancestor.pk}/' for ancestor in lineage))
+        self.assertEqual(category.depth, len(lineage) - 1)
+
+    def test_paths_follow_parents(self):
+        self.assertPath(self.cases, self.electronics, self.phones, self.smartphones, self.cases)
+        self.assertEqual(
+            CategoryService.get_descendant_ids(self.phones.pk),
+            [self.phones.pk, self.smartphones.pk, self.cases.pk],
+        )
+        self.assertEqual(CategoryService.get_subtree_ids('Home'), [self.home.pk])
+
+    def test_move_rewrites_subtree(self):
+        CategoryService.move_to(self.phones.pk, self.home.pk)
+        CategoryService.invalidate()
+
+        self.assertPath(self.phones, self.home, self.phones)
+        self.assertPath(self.smartphones, self.home, self.phones, self.smartphones)
+        self.assertPath(self.cases, self.home, self.phones, self.smartphones, self.cases)
+        self.assertPath(self.electronics, self.electronics)
+        self.assertEqual(
+            sorted(CategoryService.get_descendant_ids(self.home.pk)),
+            sorted([self.home.pk, self.phones.pk, self.smartphones.pk, self.cases.pk]),
+        )
+        self.assertEqual(CategoryService.get_descendant_ids(self.electronics.pk), [self.electronics.pk])
+
+    def test_move_to_root(self):
+        CategoryService.move_to(self.smartphones.pk)
+        CategoryService.invalidate()
+
+        self.assertPath(self.smartphones, self.smartphones)
+        self.assertPath(self.cases, self.smartphones, self.cases)
+        self.assertEqual(CategoryService.get_descendant_ids(self.phones.pk), [self.phones.pk])
+
+    def test_move_into_own_subtree_is_rejected(self):
+        with self.assertRaises(ValidationError):
+            CategoryService.move_to(self.phones.pk, self.cases.pk)
+
+        self.assertPath(self.cases, self.electronics, self.phones, self.smartphones, self.cases)
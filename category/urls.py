@@ -0,0 +1,8 @@
+from django.urls import path
+
+from category import views
+
+app_name = 'category'
+urlpatterns = [
+    path('<int:id>/', views.products_by_category, name='products_by_category'),
+]
@@ -0,0 +1,62 @@
+from django.http import Http404
+from django.shortcuts import render
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from category.services import CategoryService
+from djangoProject.exceptions import InvalidCursorError
+from djangoProject.versions import UserStateVersion
+from myapp.cache import CategoryVersion
+from myapp.constants import IMAGE_CARD_SIZES
+from myapp.pagination import cursor_query
+from myapp.services import CategoryPageService, CoreService
+
+
+def _category_etag(request, id):
+    """
+    ETag of a category page: the category's own listing version instead of
+    the global catalog version, plus the per-user state rendered on the page.
+    """
+    from cart.services import CartService
+    from favorites.services import FavoriteService
+
+    return UserStateVersion.digest([
+        CategoryVersion.get(id),
+        FavoriteService.get_favorites_version(request),
+        CartService.get_cart_version(request),
+        request.user.pk,
+        request.get_full_path(),
+    ])
+
+
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_category_etag)
+def products_by_category(request, id):
+    """Landing page of a category with the products of its whole subtree"""
+    category = CategoryService.get_node(id)
+    if category is None:
+        raise Http404("Category not found")
+
+    filter_params = CoreService.extract_filter_params(request)
+    ordering = CoreService.extract_ordering(request)
+    try:
+        page, listing = CategoryPageService.get_page(id, filter_params, request.GET.get('cursor'), ordering=ordering)
+    except InvalidCursorError:
+        page, listing = CategoryPageService.get_page(id, filter_params, ordering=ordering)
+
+    from favorites.services import FavoriteService
+
+    context = {
+        'category': category,
+        'ancestors': CategoryService.get_ancestors(id),
+        'subcategories': listing['children'],
+        'total': listing['total'],
+        'tree': CategoryService.get_nodes(),
+        'items': page.items,
+        'page': page,
+        'next_query': cursor_query(request.GET, page.next_cursor) if page.has_next else None,
+        'prev_query': cursor_query(request.GET, page.prev_cursor) if page.has_previous else None,
+        'favorites_ids': FavoriteService.get_favorites_ids(request),
+        'image_sizes': IMAGE_CARD_SIZES,
+    }
+    return render(request, 'category/products_by_category.html', context)
@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'djangoProject.settings')
 
 application = get_asgi_application()
+
+from myapp.search import warm_search_index  # noqa: E402
+
+warm_search_index()
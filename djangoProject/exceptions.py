@@ -45,3 +45,8 @@ class InvalidJsonError(ValidationError):
 class ProductNotFoundError(NotFoundError):
     """Product Not Found exception"""
     message = 'Product Not Found'
+
+
+class InvalidCursorError(ValidationError):
+    """Invalid pagination cursor exception"""
+    message = 'Invalid pagination cursor'
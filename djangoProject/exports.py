@@ -0,0 +1,104 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from djangoProject.exceptions import ValidationError
+
+CSV = 'csv'
+JSONL = 'jsonl'
+EXPORT_FORMATS = (CSV, JSONL)
+EXPORT_CHUNK_SIZE = 2000
+
+CONTENT_TYPES = {
+    CSV: 'text/csv; charset=utf-8',
+    JSONL: 'application/x-ndjson; charset=utf-8',
+}
+
+
+class Echo:
+    """File-like object whose write() returns the value, so csv.writer can feed a generator"""
+
+    def write(self, value):
+        return value
+
+
+def iter_lines(columns, rows, file_format):
+    """
+    Serializes rows one line at a time.
+    :param columns: Column names, in the order of the row tuples.
+    :param rows: Iterable of tuples, typically a queryset iterator.
+    :param file_format: 'csv' or 'jsonl'.
+    :return: Generator of text lines.
+    """
+    if file_format == CSV:
+        writer = csv.writer(Echo())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow(row)
+        return
+
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str) + '\n'
+
+
+def write_export(stream, columns, rows, file_format):
+    """Writes an export to a text stream, returns the number of data rows"""
+    count = -1 if file_format == CSV else 0
+    for line in iter_lines(columns, rows, file_format):
+        stream.write(line)
+        count += 1
+    return count
+
+
+def streaming_export_response(filename, columns, rows, file_format):
+    """Builds an attachment response that streams the rows as they are fetched"""
+    response = StreamingHttpResponse(
+        iter_lines(columns, rows, file_format),
+        content_type=CONTENT_TYPES[file_format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{file_format}"'
+    return response
+
+
+def parse_export_format(value):
+    file_format = (value or CSV).lower()
+    if file_format not in EXPORT_FORMATS:
+        raise ValidationError(f"Unsupported export format '{value}'", details={'formats': list(EXPORT_FORMATS)})
+    return file_format
+
+
+def parse_date_range(date_from, date_to):
+    """
+    Converts inclusive YYYY-MM-DD bounds into an aware [start, end) datetime range.
+    :return: Tuple (start or None, end or None).
+    """
+    bounds = []
+    for name, value in (('date_from', date_from), ('date_to', date_to)):
+        if not value:
+            bounds.append(None)
+            continue
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            raise ValidationError(f"Invalid {name}, expected YYYY-MM-DD")
+        bounds.append(day)
+
+    start, end = bounds
+    if start and end and start > end:
+        raise ValidationError("date_from is later than date_to")
+
+    def to_datetime(day):
+        moment = datetime.combine(day, time.min)
+        return timezone.make_aware(moment) if settings.USE_TZ else moment
+
+    return (
+        to_datetime(start) if start else None,
+        to_datetime(end + timedelta(days=1)) if end else None,
+    )
@@ -22,6 +22,7 @@ from django.conf import settings
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('hello/', include("myapp.urls", namespace="myapp")),
+    path('category/', include("category.urls", namespace="category")),
 
     path('users/', include("users.urls", namespace="users")),
     path('cart/', include("cart.urls", namespace="cart")),
@@ -1,4 +1,6 @@
 import json
+from itertools import islice
+
 from djangoProject.exceptions import ValidationError
 
 
@@ -8,3 +10,37 @@ def parse_json_body(request):
         return json.loads(request.body)
     except json.JSONDecodeError:
         raise ValidationError("Invalid JSON format")
+
+
+def batched(iterable, size):
+    """Splits an iterable into lists of at most size items"""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def request_memo(request, key, compute):
+    """
+    Computes a value once per request and keeps it on the request.
+    :param request: HttpRequest the value belongs to.
+    :param key: Memo key.
+    :param compute: Callable producing the value.
+    :return: Memoized value.
+    """
+    memo = request.__dict__.setdefault('_memo', {})
+    if key not in memo:
+        memo[key] = compute()
+    return memo[key]
+
+
+def peek_request_memo(request, key, default=None):
+    """Returns a memoized value without computing it"""
+    return request.__dict__.get('_memo', {}).get(key, default)
+
+
+def forget_request_memo(request, *keys):
+    """Drops memoized values after the state they describe has changed"""
+    memo = request.__dict__.get('_memo')
+    if memo:
+        for key in keys:
+            memo.pop(key, None)
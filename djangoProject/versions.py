@@ -0,0 +1,38 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+
+
+class UserStateVersion:
+    """
+    Per-user version counters for state rendered into every page
+    (cart, favorites). Used to build ETags without touching the tables.
+    """
+
+    @staticmethod
+    def get(namespace, user_id):
+        version = cache.get(UserStateVersion._key(namespace, user_id))
+        if version is None:
+            cache.add(UserStateVersion._key(namespace, user_id), 1, None)
+            version = cache.get(UserStateVersion._key(namespace, user_id), 1)
+        return version
+
+    @staticmethod
+    def bump(namespace, user_id):
+        key = UserStateVersion._key(namespace, user_id)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, None)
+            return cache.incr(key)
+
+    @staticmethod
+    def digest(data):
+        """Short digest of JSON-serializable state, used as a version of session data"""
+        payload = json.dumps(data, sort_keys=True, default=str)
+        return hashlib.md5(payload.encode()).hexdigest()[:12]
+
+    @staticmethod
+    def _key(namespace, user_id):
+        return f'{namespace}:version:{user_id}'
@@ -2,8 +2,9 @@ import logging
 from abc import abstractmethod, ABC
 
 from django.http import HttpRequest
-from typing import Any, Dict
+from typing import Any, Dict, List
 
+from djangoProject.versions import UserStateVersion
 from favorites.models import Favorite
 from favorites.exceptions import FavoriteOperationError
 from myapp.models import Product
@@ -32,6 +33,11 @@ class FavoriteInterface(ABC):
         """Get all favorite products"""
         pass
 
+    @abstractmethod
+    def get_favorites_ids(self) -> List[int]:
+        """Get ids of favorite products without loading the products"""
+        pass
+
     @abstractmethod
     def get_favorites_count(self) -> int:
         """Get count of favorite items"""
@@ -42,6 +48,11 @@ class FavoriteInterface(ABC):
         """Clear all favorites"""
         pass
 
+    @abstractmethod
+    def get_version(self) -> Any:
+        """Get version of favorites, changes whenever they change"""
+        pass
+
 
 class FavoriteDB(FavoriteInterface):
     """Database-based favorites for authenticated users"""
@@ -59,6 +70,7 @@ class FavoriteDB(FavoriteInterface):
             )
 
             if created:
+                self._bump_version()
                 logger.info(f"Added product {product.id} to favorites for user {self._user.id}")
                 message = 'Added to favorites'
             else:
@@ -85,6 +97,7 @@ class FavoriteDB(FavoriteInterface):
             ).delete()
 
             if deleted_count > 0:
+                self._bump_version()
                 logger.info(f"Removed product {product_id} from favorites for user {self._user.id}")
                 message = 'Removed from favorites'
             else:
@@ -123,6 +136,10 @@ class FavoriteDB(FavoriteInterface):
             logger.error(f"Error getting favorites from DB: {str(e)}")
             raise FavoriteOperationError(f"Failed to get favorites: {str(e)}") from e
 
+    def get_favorites_ids(self) -> List[int]:
+        """Get ids of favorite products from database"""
+        return list(Favorite.objects.filter(user=self._user).values_list('product_id', flat=True))
+
     def get_favorites_count(self) -> int:
         """Get count of favorite items in database"""
         return Favorite.objects.filter(user=self._user).count()
@@ -131,6 +148,7 @@ class FavoriteDB(FavoriteInterface):
         """Clear all database favorites"""
         try:
             deleted_count, _ = Favorite.objects.filter(user=self._user).delete()
+            self._bump_version()
             logger.info(f"Cleared {deleted_count} favorites for user {self._user.id}")
 
             return {
@@ -146,11 +164,19 @@ class FavoriteDB(FavoriteInterface):
         """Bulk create favorite items"""
         try:
             Favorite.objects.bulk_create(favorite_items, ignore_conflicts=True)
+            self._bump_version()
             logger.info(f"Bulk created {len(favorite_items)} favorite items")
         except Exception as e:
             logger.error(f"Error bulk creating favorite items: {str(e)}")
             raise FavoriteOperationError(f"Failed to bulk create favorites: {str(e)}") from e
 
+    def get_version(self):
+        """Version of the user's favorites, changes on every mutation"""
+        return UserStateVersion.get('favorites', self._user.id)
+
+    def _bump_version(self):
+        UserStateVersion.bump('favorites', self._user.id)
+
 
 class FavoriteSyncService:
     """Service for synchronizing favorites between session and database"""
@@ -282,6 +308,10 @@ class FavoriteSession(FavoriteInterface):
             logger.error(f"Error getting session favorites: {str(e)}")
             raise FavoriteOperationError(f"Failed to get favorites: {str(e)}") from e
 
+    def get_favorites_ids(self) -> List[int]:
+        """Get ids of favorite products from session"""
+        return list(self._favorites)
+
     def get_favorites_count(self) -> int:
         """Get count of favorite items in session"""
         return len(self._favorites)
@@ -304,6 +334,10 @@ class FavoriteSession(FavoriteInterface):
             logger.error(f"Error clearing session favorites: {str(e)}")
             raise FavoriteOperationError(f"Failed to clear favorites: {str(e)}") from e
 
+    def get_version(self):
+        """Version of the session favorites, a digest of their content"""
+        return UserStateVersion.digest(sorted(self._favorites))
+
     def _save_to_session(self):
         """Save favorites set to session"""
         self._session['favorites'] = list(self._favorites)
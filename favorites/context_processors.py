@@ -1,6 +1,7 @@
+from django.utils.functional import SimpleLazyObject
+
 from favorites.services import FavoriteService
 
 def favorites_count(request):
-    """Context processor to add favorites count to all templates"""
-    count = FavoriteService.get_favorites_count(request)
-    return {'favorites_count': count}
+    """Context processor to add favorites count to all templates, evaluated only when read"""
+    return {'favorites_count': SimpleLazyObject(lambda: FavoriteService.get_favorites_count(request))}
@@ -4,6 +4,7 @@ from django.http import HttpRequest
 
 from favorites.FavoriteFactory import FavoriteFactory
 from favorites.exceptions import FavoriteOperationError
+from djangoProject.utils import forget_request_memo, request_memo
 from myapp.models import Product
 
 logger = logging.getLogger(__name__)
@@ -13,6 +14,7 @@ class FavoriteService:
     @staticmethod
     def toggle_favorite(request: HttpRequest, product_id: int):
         favorite_handler = FavoriteFactory.build_favorite(request)
+        forget_request_memo(request, 'favorites_count')
 
         try:
             product = Product.objects.get(id=product_id)
@@ -44,6 +46,7 @@ class FavoriteService:
     @staticmethod
     def add_to_favorites(request: HttpRequest, product_id: int):
         favorite_handler = FavoriteFactory.build_favorite(request)
+        forget_request_memo(request, 'favorites_count')
 
         try:
             product = Product.objects.get(id=product_id)
@@ -66,6 +69,7 @@ class FavoriteService:
     @staticmethod
     def remove_from_favorites(request: HttpRequest, product_id: int):
         favorite_handler = FavoriteFactory.build_favorite(request)
+        forget_request_memo(request, 'favorites_count')
 
         try:
             return favorite_handler.remove_from_favorites(product_id)
@@ -84,8 +88,7 @@ class FavoriteService:
     @staticmethod
     def get_favorites_ids(request):
         favorite_handler = FavoriteFactory.build_favorite(request)
-        favorites_data = favorite_handler.get_favorites()
-        return favorites_data.get('favorites_ids', [])
+        return favorite_handler.get_favorites_ids()
 
     @staticmethod
     def is_favorite(request, product_id: int):
@@ -94,5 +97,11 @@ class FavoriteService:
 
     @staticmethod
     def get_favorites_count(request: HttpRequest) -> int:
+        """Get favorites count, computed once per request"""
         favorite_handler = FavoriteFactory.build_favorite(request)
-        return favorite_handler.get_favorites_count()
+        return request_memo(request, 'favorites_count', favorite_handler.get_favorites_count)
+
+    @staticmethod
+    def get_favorites_version(request: HttpRequest):
+        favorite_handler = FavoriteFactory.build_favorite(request)
+        return favorite_handler.get_version()
@@ -0,0 +1,82 @@
+from django.db.models import Q
+
+from myapp.Filters.FilterFactory import FilterFactory
+
+LOOKUP_OPERATORS = {
+    'exact': '=',
+    'gte': '>=',
+    'lte': '<=',
+    'gt': '>',
+    'lt': '<',
+    'in': 'IN',
+}
+
+
+class FilterPlan:
+    """
+    Result of compiling the active filters into a single Q expression.
+    An empty plan means the filters can never match, so no query is needed.
+    """
+
+    def __init__(self, q=None, is_empty=False, reason=None):
+        self.q = q if q is not None else Q()
+        self.is_empty = is_empty
+        self.reason = reason
+
+    @classmethod
+    def empty(cls, reason):
+        return cls(is_empty=True, reason=reason)
+
+    def conditions(self):
+        """Returns the plan as a list of (field, lookup, value) tuples"""
+        conditions = []
+        for lookup, value in self.q.children:
+            field, _, operator = lookup.partition('__')
+            conditions.append((field, operator or 'exact', value))
+        return conditions
+
+    def describe(self):
+        """Human readable plan for logging"""
+        if self.is_empty:
+            return f'EMPTY ({self.reason})'
+        if not self.q.children:
+            return 'FULL SCAN'
+        return 'WHERE ' + ' AND '.join(
+            f'{field} {LOOKUP_OPERATORS.get(lookup, lookup)} {value!r}'
+            for field, lookup, value in self.conditions()
+        )
+
+    def __str__(self):
+        return self.describe()
+
+
+class FilterPlanner:
+    """Compiles filter params into one index-friendly WHERE on myapp_product columns"""
+
+    range_params = (
+        ('min_price', 'max_price'),
+        ('min_weight', 'max_weight'),
+    )
+
+    def __init__(self, factory=None):
+        self.factory = factory or FilterFactory()
+
+    def plan(self, filter_params):
+        """
+        Builds a FilterPlan for the given filter params.
+        :param filter_params: Dictionary from CoreService.extract_filter_params.
+        :return: FilterPlan instance.
+        """
+        for min_key, max_key in self.range_params:
+            min_value, max_value = filter_params.get(min_key), filter_params.get(max_key)
+            if min_value is not None and max_value is not None and min_value > max_value:
+                return FilterPlan.empty(f'{min_key} > {max_key}')
+
+        q = Q()
+        for filter_instance in self.factory.create_filters(filter_params):
+            filter_q = filter_instance.to_q()
+            if filter_q is None:
+                return FilterPlan.empty(f'{type(filter_instance).__name__} matches nothing')
+            q &= filter_q
+
+        return FilterPlan(q)
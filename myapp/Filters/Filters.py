@@ -1,78 +1,101 @@
 from abc import ABC, abstractmethod
 
+from django.db.models import Q
+
+
 class FilterInterface(ABC):
     """
     Интерфейс для фильтров
     """
 
     @abstractmethod
+    def to_q(self):
+        """
+        Компилирует фильтр в Q-выражение.
+        :return: Q-выражение или None, если фильтру не соответствует ни один товар.
+        """
+        pass
+
     def apply_filter(self, queryset):
         """
         Применяет фильтр QuerySet.
         :param queryset: QuerySet для фильтрации.
         :return: Отфильтрованный QuerySet.
         """
-        pass
+        q = self.to_q()
+        if q is None:
+            return queryset.none()
+        return queryset.filter(q)
 
 
 class MinPriceFilter(FilterInterface):
     def __init__(self, min_price):
         self.min_price = min_price
 
-    def apply_filter(self, queryset):
+    def to_q(self):
         """
-        Фильтрует QuerySet по минимальной цене.
+        Фильтрует по минимальной цене.
         """
         if self.min_price:
-            return queryset.filter(price__gte=self.min_price)
-        return queryset
+            return Q(price__gte=self.min_price)
+        return Q()
 
 
 class MaxPriceFilter(FilterInterface):
     def __init__(self, max_price):
         self.max_price = max_price
 
-    def apply_filter(self, queryset):
+    def to_q(self):
         """
-        Фильтрует QuerySet по максимальной цене.
+        Фильтрует по максимальной цене.
         """
         if self.max_price:
-            return queryset.filter(price__lte=self.max_price)
-        return queryset
+            return Q(price__lte=self.max_price)
+        return Q()
 
 
 class CategoryFilter(FilterInterface):
     def __init__(self, category):
         self.category = category
 
-    def apply_filter(self, queryset):
+    def to_q(self):
         """
-        Фильтрует QuerySet по категории.
+        Фильтрует по категории вместе со всеми подкатегориями.
+        Поддерево разрешается в id по кэшированному дереву, поэтому JOIN не нужен.
         """
-        if self.category:
-            return queryset.filter(category__name=self.category)
-        return queryset
+        if not self.category:
+            return Q()
+
+        from category.services import CategoryService
+        category_ids = CategoryService.get_subtree_ids(self.category)
+        if not category_ids:
+            return None
+        if len(category_ids) == 1:
+            return Q(category_id=category_ids[0])
+        return Q(category_id__in=category_ids)
+
 
 class MinWeightFilter(FilterInterface):
     def __init__(self, min_weight):
         self.min_weight = min_weight
 
-    def apply_filter(self, queryset):
+    def to_q(self):
         """
-        Фильтрует QuerySet по минимальному весу.
+        Фильтрует по минимальному весу.
         """
         if self.min_weight:
-            return queryset.filter(weight__gte=self.min_weight)
-        return queryset
+            return Q(weight__gte=self.min_weight)
+        return Q()
+
 
 class MaxWeightFilter(FilterInterface):
     def __init__(self, max_weight):
         self.max_weight = max_weight
 
-    def apply_filter(self, queryset):
+    def to_q(self):
         """
-        Фильтрует QuerySet по максимальному весу.
+        Фильтрует по максимальному весу.
         """
         if self.max_weight:
-            return queryset.filter(weight__lte=self.max_weight)
-        return queryset
+            return Q(weight__lte=self.max_weight)
+        return Q()
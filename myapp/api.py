@@ -0,0 +1,100 @@
+from django.http import JsonResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET
+
+from djangoProject.decorators import handler_api_errors
+from djangoProject.exceptions import ProductNotFoundError, ValidationError
+from djangoProject.versions import UserStateVersion
+from myapp.cache import CatalogVersion
+from myapp.constants import API_DEFAULT_FIELDS, API_MAX_PAGE_SIZE, API_PRODUCT_FIELDS, CATALOG_PAGE_SIZE
+from myapp.models import Product
+from myapp.pagination import CursorPage, CursorPaginator
+from myapp.services import CoreService
+
+
+def _parse_fields(request):
+    """
+    Parses the 'fields' sparse fieldset parameter.
+    :return: Tuple of public field names, always including 'id'.
+    """
+    raw = request.GET.get('fields')
+    if not raw:
+        return API_DEFAULT_FIELDS
+
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in API_PRODUCT_FIELDS]
+    if unknown:
+        raise ValidationError("Unknown fields", details={'fields': unknown, 'allowed': list(API_PRODUCT_FIELDS)})
+    return tuple(dict.fromkeys(['id', *fields]))
+
+
+def _parse_page_size(request):
+    try:
+        page_size = int(request.GET.get('page_size', CATALOG_PAGE_SIZE))
+    except ValueError:
+        raise ValidationError("Parameter 'page_size' must be an integer")
+    return max(1, min(page_size, API_MAX_PAGE_SIZE))
+
+
+def _projection(fields):
+    """values() projection that selects only the requested columns"""
+    return Product.objects.values(*[API_PRODUCT_FIELDS[field] for field in fields])
+
+
+def _serialize(row, fields):
+    data = {field: row[API_PRODUCT_FIELDS[field]] for field in fields}
+    if 'image' in data:
+        data['image'] = Product.image.field.storage.url(data['image']) if data['image'] else None
+    if 'updated_at' in data:
+        data['updated_at'] = data['updated_at'].isoformat()
+    return data
+
+
+def _api_etag(request, *args, **kwargs):
+    return UserStateVersion.digest([CatalogVersion.get(), request.get_full_path()])
+
+
+def _api_last_modified(request, *args, **kwargs):
+    return CatalogVersion.get_modified()
+
+
+@handler_api_errors
+@require_GET
+@cache_control(no_cache=True)
+@condition(etag_func=_api_etag, last_modified_func=_api_last_modified)
+def product_list(request):
+    """Cursor-paginated product listing with catalog filters and sparse fieldsets"""
+    fields = _parse_fields(request)
+    try:
+        filter_params = CoreService.extract_filter_params(request)
+    except ValueError:
+        raise ValidationError("Invalid filter parameters")
+    plan = CoreService.get_filter_plan(filter_params)
+
+    if plan.is_empty:
+        page = CursorPage([])
+    else:
+        queryset = _projection(fields).filter(plan.q)
+        page = CursorPaginator(queryset, ordering='id', page_size=_parse_page_size(request)).page(
+            request.GET.get('cursor')
+        )
+
+    return JsonResponse({
+        'data': [_serialize(row, fields) for row in page.items],
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+    })
+
+
+@handler_api_errors
+@require_GET
+@cache_control(no_cache=True)
+@condition(etag_func=_api_etag, last_modified_func=_api_last_modified)
+def product_detail(request, id):
+    """Single product with sparse fieldsets"""
+    fields = _parse_fields(request)
+    row = _projection(fields).filter(pk=id).first()
+    if row is None:
+        raise ProductNotFoundError(details={'product_id': id})
+
+    return JsonResponse({'data': _serialize(row, fields)})
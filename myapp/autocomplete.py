@@ -0,0 +1,126 @@
+import heapq
+import logging
+from bisect import bisect_left, insort
+
+from django.db.models import Count
+
+from myapp.cache import CatalogVersion, VersionedIndex
+from myapp.constants import AUTOCOMPLETE_DEFAULT_LIMIT, AUTOCOMPLETE_SCAN_LIMIT
+from myapp.search import tokenize
+
+logger = logging.getLogger(__name__)
+
+PRODUCT = 'product'
+CATEGORY = 'category'
+
+
+def suffixes(name):
+    """Keys for a name: the whole name and every tail starting at a word"""
+    words = tokenize(name)
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+
+class AutocompleteIndex(VersionedIndex):
+    """
+    Sorted array of normalized product and category names searched with bisect.
+    Every name is indexed from each word start, so "15" finds "iPhone 15".
+    Matches are ranked by popularity: units sold (Product.popularity) for products,
+    number of products for categories.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._reset()
+
+    def _reset(self):
+        self._keys = []
+        self._entries = {}
+        self._popularity = {}
+
+    def build(self):
+        """Loads product and category names from the database into a new index, then swaps it in"""
+        from category.models import Category
+        from myapp.models import Product
+
+        version = CatalogVersion.get()
+        index = AutocompleteIndex()
+
+        for product_id, name, popularity in Product.objects.values_list('id', 'name', 'popularity').iterator():
+            index._add(PRODUCT, product_id, name, popularity)
+
+        categories = Category.objects.annotate(product_count=Count('products')).values_list(
+            'id', 'name', 'product_count'
+        )
+        for category_id, name, product_count in categories:
+            index._add(CATEGORY, category_id, name, product_count)
+        index._keys.sort()
+
+        with self._lock:
+            self._keys, self._entries, self._popularity = index._keys, index._entries, index._popularity
+            self._version = version
+        logger.info(f"Autocomplete index built: {len(self._entries)} names, {len(self._keys)} keys")
+
+    def upsert(self, product, version=None):
+        """Re-indexes the name of a saved product"""
+        with self._lock:
+            if self._version is None:
+                return
+            self._remove(PRODUCT, product.id)
+            self._add(PRODUCT, product.id, product.name, product.popularity, keep_sorted=True)
+            self._follow(version)
+
+    def remove(self, product_id, version=None):
+        """Drops a deleted product"""
+        with self._lock:
+            if self._version is None:
+                return
+            self._remove(PRODUCT, product_id)
+            self._follow(version)
+
+    def suggest(self, prefix, limit=AUTOCOMPLETE_DEFAULT_LIMIT):
+        """
+        Returns the most popular names starting with the prefix.
+        :param prefix: Text typed by the shopper.
+        :param limit: Maximum number of suggestions.
+        :return: List of dictionaries with 'type', 'id' and 'name'.
+        """
+        prefix = ' '.join(tokenize(prefix))
+        if not prefix:
+            return []
+
+        self.ensure_built()
+        with self._lock:
+            matches = {}
+            position = bisect_left(self._keys, (prefix,))
+            for key, kind, object_id in self._keys[position:position + AUTOCOMPLETE_SCAN_LIMIT]:
+                if not key.startswith(prefix):
+                    break
+                matches[(kind, object_id)] = self._popularity[(kind, object_id)]
+
+            best = heapq.nlargest(limit, matches.items(), key=lambda item: (item[1], -item[0][1]))
+            return [
+                {'type': kind, 'id': object_id, 'name': self._entries[(kind, object_id)]}
+                for (kind, object_id), _ in best
+            ]
+
+    def _add(self, kind, object_id, name, popularity, keep_sorted=False):
+        self._entries[(kind, object_id)] = name
+        self._popularity[(kind, object_id)] = popularity
+        for key in suffixes(name):
+            if keep_sorted:
+                insort(self._keys, (key, kind, object_id))
+            else:
+                self._keys.append((key, kind, object_id))
+
+    def _remove(self, kind, object_id):
+        name = self._entries.pop((kind, object_id), None)
+        self._popularity.pop((kind, object_id), None)
+        if name is None:
+            return
+        for key in suffixes(name):
+            position = bisect_left(self._keys, (key, kind, object_id))
+            if position < len(self._keys) and self._keys[position] == (key, kind, object_id):
+                del self._keys[position]
+
+
+autocomplete_index = AutocompleteIndex()
@@ -0,0 +1,320 @@
+import hashlib
+import json
+import logging
+import threading
+from abc import ABC, abstractmethod
+from array import array
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+from myapp.constants import (
+    FILTER_RESULT_CACHE_MAX_ENTRIES, FILTER_RESULT_CACHE_MAX_IDS, FILTER_RESULT_MAX_IDS_PER_ENTRY
+)
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION_KEY = 'catalog:version'
+CATALOG_MODIFIED_KEY = 'catalog:modified'
+CATEGORY_TREE_VERSION_KEY = 'catalog:category_tree:version'
+
+
+class CatalogVersion:
+    """Shared catalog version counter, bumped on every catalog write"""
+
+    @staticmethod
+    def get():
+        version = cache.get(CATALOG_VERSION_KEY)
+        if version is None:
+            cache.add(CATALOG_VERSION_KEY, 1, None)
+            version = cache.get(CATALOG_VERSION_KEY, 1)
+        return version
+
+    @staticmethod
+    def bump():
+        try:
+            version = cache.incr(CATALOG_VERSION_KEY)
+        except ValueError:
+            cache.add(CATALOG_VERSION_KEY, 1, None)
+            version = cache.incr(CATALOG_VERSION_KEY)
+        cache.set(CATALOG_MODIFIED_KEY, timezone.now(), None)
+        logger.debug(f"Catalog version bumped to {version}")
+        return version
+
+    @staticmethod
+    def get_modified():
+        """Time of the last catalog write, None if unknown"""
+        return cache.get(CATALOG_MODIFIED_KEY)
+
+
+class CategoryVersion:
+    """
+    Per-category version counters for category listings.
+    A product write bumps only the categories it leaves or enters (and their
+    ancestors), so listings of unrelated categories keep their cache entries.
+    Changes of the tree itself bump one shared tree version.
+    """
+
+    @staticmethod
+    def get(category_id):
+        """Returns the version token of one category listing"""
+        keys = [CATEGORY_TREE_VERSION_KEY, CategoryVersion._key(category_id)]
+        versions = cache.get_many(keys)
+        for key in keys:
+            if key not in versions:
+                cache.add(key, 1, None)
+                versions[key] = cache.get(key, 1)
+        return f'{versions[keys[0]]}.{versions[keys[1]]}'
+
+    @staticmethod
+    def bump(category_ids):
+        """Bumps the listings of the given categories"""
+        for category_id in set(category_ids):
+            key = CategoryVersion._key(category_id)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.add(key, 1, None)
+                cache.incr(key)
+        logger.debug(f"Category versions bumped: {sorted(set(category_ids))}")
+
+    @staticmethod
+    def bump_tree():
+        """Bumps every category listing at once, used when the tree changes"""
+        try:
+            cache.incr(CATEGORY_TREE_VERSION_KEY)
+        except ValueError:
+            cache.add(CATEGORY_TREE_VERSION_KEY, 1, None)
+            cache.incr(CATEGORY_TREE_VERSION_KEY)
+
+    @staticmethod
+    def _key(category_id):
+        return f'catalog:category:{category_id}:version'
+
+
+def normalize_filter_params(filter_params):
+    """
+    Canonical form of filter params: empty values dropped, keys sorted,
+    integral floats collapsed to int so that 1 and 1.0 share a cache entry.
+    """
+    normalized = {}
+    for key in sorted(filter_params):
+        value = filter_params[key]
+        if value is None or value == '':
+            continue
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        normalized[key] = value
+    return normalized
+
+
+def make_filter_key(prefix, filter_params):
+    """Builds a short cache key from the canonical filter params"""
+    payload = json.dumps(normalize_filter_params(filter_params), separators=(',', ':'), ensure_ascii=False)
+    digest = hashlib.md5(payload.encode()).hexdigest()
+    return f'{prefix}:{digest}'
+
+
+class LRUCache:
+    """
+    Thread-safe process-local LRU cache.
+    Bounded by the number of entries and by the total weight of the values.
+    """
+
+    def __init__(self, max_entries, max_weight=None, weigh=None):
+        self.max_entries = max_entries
+        self.max_weight = max_weight
+        self._weigh = weigh or (lambda value: 1)
+        self._data = OrderedDict()
+        self._weight = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        weight = self._weigh(value)
+        with self._lock:
+            if key in self._data:
+                self._weight -= self._weigh(self._data.pop(key))
+            self._data[key] = value
+            self._weight += weight
+            while self._data and (
+                len(self._data) > self.max_entries
+                or (self.max_weight is not None and self._weight > self.max_weight)
+            ):
+                _, evicted = self._data.popitem(last=False)
+                self._weight -= self._weigh(evicted)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._weight -= self._weigh(self._data.pop(key))
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._weight = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._data),
+                'weight': self._weight,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def __len__(self):
+        return len(self._data)
+
+
+class FilterResultCache:
+    """
+    Ordered product id lists per canonical filter set and ordering.
+    Entries belong to one catalog version; a version bump drops them all.
+    """
+
+    # Marker for results too large to cache, so they go straight to the database
+    TOO_LARGE = (array('q'), None)
+
+    def __init__(self):
+        self._lru = LRUCache(
+            FILTER_RESULT_CACHE_MAX_ENTRIES,
+            max_weight=FILTER_RESULT_CACHE_MAX_IDS,
+            weigh=self._weigh,
+        )
+        self._version = None
+        self.invalidations = 0
+
+    def get_ids(self, filter_params, compute, ordering='id'):
+        """
+        Returns the cached id list for the filters, computing it on a miss.
+        :param filter_params: Dictionary from CoreService.extract_filter_params.
+        :param compute: Callable returning the ordered ids when ordering by id, otherwise
+                        (sort key, id) rows; at most FILTER_RESULT_MAX_IDS_PER_ENTRY + 1 of them.
+        :param ordering: Sort field, optionally prefixed with '-'.
+        :return: Tuple (ids, keys) of arrays, keys is None when ordering by id;
+                 None if the result is too large to cache.
+        """
+        self._check_version()
+        key = make_filter_key('ids', {**filter_params, 'ordering': ordering})
+        entry = self._lru.get(key)
+        if entry is None:
+            rows = list(compute())
+            if len(rows) > FILTER_RESULT_MAX_IDS_PER_ENTRY:
+                entry = self.TOO_LARGE
+            elif ordering.lstrip('-') == 'id':
+                entry = (array('q', rows), None)
+            else:
+                entry = (array('q', (row[1] for row in rows)), array('d', (row[0] for row in rows)))
+            self._lru.set(key, entry)
+        return None if entry is self.TOO_LARGE else entry
+
+    @staticmethod
+    def _weigh(entry):
+        ids, keys = entry
+        return len(ids) if keys is None else 2 * len(ids)
+
+    def stats(self):
+        stats = self._lru.stats()
+        stats['version'] = self._version
+        stats['invalidations'] = self.invalidations
+        return stats
+
+    def _check_version(self):
+        version = CatalogVersion.get()
+        if version != self._version:
+            if self._version is not None:
+                self._lru.clear()
+                self.invalidations += 1
+            self._version = version
+
+
+filter_result_cache = FilterResultCache()
+
+
+class VersionedIndex(ABC):
+    """
+    Base class for process-local catalog indexes.
+    Local writes are applied incrementally through upsert/remove; after a
+    catalog version change made by another process the index is rebuilt by
+    one background thread while requests keep reading the previous data.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()
+        self._version = None
+
+    @abstractmethod
+    def build(self):
+        """Loads the index from the database under the current catalog version"""
+        pass
+
+    @abstractmethod
+    def upsert(self, product, version=None):
+        """Applies a saved product to the index"""
+        pass
+
+    @abstractmethod
+    def remove(self, product_id, version=None):
+        """Removes a deleted product from the index"""
+        pass
+
+    def ensure_built(self):
+        """
+        Keeps the index on the current catalog version.
+        Only the very first build runs in the request, later ones in the background.
+        """
+        if self._version == CatalogVersion.get():
+            return
+        if self._version is not None:
+            self._rebuild_in_background()
+            return
+        with self._build_lock:
+            # Another thread may have built the index while this one waited for the lock
+            if self._version is None:
+                self.build()
+
+    def _rebuild_in_background(self):
+        if not self._build_lock.acquire(blocking=False):
+            return
+        thread = threading.Thread(target=self._rebuild, name=f'{type(self).__name__}-rebuild', daemon=True)
+        try:
+            thread.start()
+        except RuntimeError:
+            self._build_lock.release()
+            raise
+
+    def _rebuild(self):
+        try:
+            if self._version != CatalogVersion.get():
+                self.build()
+        except Exception as e:
+            logger.error(f"{type(self).__name__} rebuild failed: {str(e)}")
+        finally:
+            connection.close()
+            self._build_lock.release()
+
+    def _follow(self, version):
+        """Marks the index as current if it was in sync before this local write"""
+        if version is not None and self._version == version - 1:
+            self._version = version
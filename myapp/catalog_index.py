@@ -0,0 +1,249 @@
+import logging
+import operator
+import sys
+
+import numpy as np
+from django.conf import settings
+
+from myapp.cache import CatalogVersion, VersionedIndex
+from myapp.constants import CATALOG_PAGE_SIZE, CATALOG_INDEX_CHUNK_SIZE
+from myapp.pagination import CursorPage, NEXT, PREV, decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+NULL_CATEGORY = -1
+
+COLUMN_TYPES = {
+    'id': np.int64,
+    'price': np.int64,
+    'weight': np.float64,
+    'category_id': np.int64,
+    'popularity': np.int64,
+}
+
+# Lookup -> vectorized comparison of a whole column with the lookup value
+PREDICATES = {
+    'exact': operator.eq,
+    'gte': operator.ge,
+    'lte': operator.le,
+    'gt': operator.gt,
+    'lt': operator.lt,
+    'in': lambda column, value: np.isin(column, list(value)),
+}
+
+
+class CatalogIndex(VersionedIndex):
+    """
+    Columnar in-memory index of Product id/price/weight/category_id/popularity.
+    Filters are evaluated as numpy boolean masks over the columns and combined
+    with a bitwise AND, so filtered listings never reach the database; only the
+    rows of the requested page are fetched afterwards.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._columns, self._size, self._rows = self._empty_columns(0), 0, {}
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'CATALOG_INDEX_ENABLED', False)
+
+    def build(self):
+        """Loads all products from the database into new columns, then swaps them in"""
+        from myapp.models import Product
+
+        version = CatalogVersion.get()
+        rows = Product.objects.order_by('id').values_list(*COLUMN_TYPES)
+        values = list(rows.iterator(chunk_size=CATALOG_INDEX_CHUNK_SIZE))
+        columns = self._empty_columns(len(values))
+        for (name, column), column_values in zip(columns.items(), zip(*values)):
+            if name == 'category_id':
+                column_values = map(self._category, column_values)
+            column[:] = np.fromiter(column_values, dtype=column.dtype, count=len(values))
+
+        with self._lock:
+            self._columns, self._size = columns, len(values)
+            self._rows = {product_id: row for row, product_id in enumerate(columns['id'].tolist())}
+            self._version = version
+        logger.info(f"Catalog index built: {len(self)} products, {self.memory_footprint()['total']} bytes")
+
+    def upsert(self, product, version=None):
+        """Applies a saved product to the index"""
+        with self._lock:
+            if self._version is None:
+                return
+            row = self._rows.get(product.id)
+            if row is None:
+                row = self._append(product.id)
+            self._columns['price'][row] = product.price
+            self._columns['weight'][row] = product.weight
+            self._columns['category_id'][row] = self._category(product.category_id)
+            self._columns['popularity'][row] = product.popularity
+            self._follow(version)
+
+    def remove(self, product_id, version=None):
+        """Removes a deleted product from the index (swap with the last row)"""
+        with self._lock:
+            if self._version is None:
+                return
+            row = self._rows.pop(product_id, None)
+            if row is not None:
+                last = self._size - 1
+                for column in self._columns.values():
+                    column[row] = column[last]
+                self._size = last
+                if row != last:
+                    self._rows[int(self._columns['id'][row])] = row
+            self._follow(version)
+
+    def supports(self, plan, ordering='id'):
+        """Checks that every condition and the ordering map onto index columns"""
+        return ordering.lstrip('-') in self._columns and all(
+            field in self._columns and lookup in PREDICATES
+            for field, lookup, _ in plan.conditions()
+        )
+
+    def page(self, plan, cursor=None, ordering='id', page_size=CATALOG_PAGE_SIZE):
+        """
+        Returns a page of product ids matching the plan, ordered by (sort key, id).
+        :param plan: FilterPlan produced by FilterPlanner.
+        :param cursor: Opaque cursor, compatible with CursorPaginator.
+        :param ordering: Sort field, optionally prefixed with '-'.
+        :param page_size: Number of ids per page.
+        :return: CursorPage of product ids.
+        """
+        self.ensure_built()
+        descending = ordering.startswith('-')
+        field = ordering.lstrip('-')
+        position, reverse = None, False
+        if cursor:
+            position, direction = decode_cursor(cursor)
+            reverse = direction == PREV
+
+        with self._lock:
+            # Fancy indexing copies the matching rows, the rest runs without the lock
+            rows = np.flatnonzero(self.mask(plan))
+            ids, keys = self._column('id')[rows], self._column(field)[rows]
+
+        scan_descending = descending != reverse
+        if position is not None:
+            value, pk = (position[1], position[1]) if field == 'id' else position
+            before = operator.lt if scan_descending else operator.gt
+            seek = before(keys, value) | ((keys == value) & before(ids, pk))
+            ids, keys = ids[seek], keys[seek]
+
+        limit = page_size + 1
+        if len(keys) > limit:
+            # Only rows whose key can be among the first `limit` (ties included) are sorted
+            if scan_descending:
+                threshold = np.partition(keys, len(keys) - limit)[len(keys) - limit]
+                candidates = keys >= threshold
+            else:
+                threshold = np.partition(keys, limit - 1)[limit - 1]
+                candidates = keys <= threshold
+            ids, keys = ids[candidates], keys[candidates]
+
+        order = np.lexsort((ids, keys))
+        if scan_descending:
+            order = order[::-1]
+        order = order[:limit]
+        positions = [list(position) for position in zip(keys[order].tolist(), ids[order].tolist())]
+
+        has_more = len(positions) > page_size
+        positions = positions[:page_size]
+        if reverse:
+            positions.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, bool(cursor)
+
+        if not positions:
+            return CursorPage([])
+
+        return CursorPage(
+            [product_id for _, product_id in positions],
+            next_cursor=encode_cursor(positions[-1], NEXT) if has_next else None,
+            prev_cursor=encode_cursor(positions[0], PREV) if has_previous else None,
+        )
+
+    def count(self, plan):
+        """Returns the number of products matching the plan"""
+        self.ensure_built()
+        with self._lock:
+            return int(np.count_nonzero(self.mask(plan)))
+
+    def count_buckets(self, plan, buckets):
+        """
+        Counts the products matching the plan within each bucket.
+        The plan mask is computed once, every bucket only adds its own conditions.
+        :param plan: FilterPlan shared by all buckets.
+        :param buckets: List of FilterPlan, one per bucket.
+        :return: List of counts in bucket order.
+        """
+        self.ensure_built()
+        with self._lock:
+            base = self.mask(plan)
+            return [int(np.count_nonzero(base & self.mask(bucket))) for bucket in buckets]
+
+    def filter_ids(self, plan, product_ids):
+        """Returns the subset of product_ids matching the plan"""
+        self.ensure_built()
+        with self._lock:
+            mask = self.mask(plan)
+            return {product_id for product_id in product_ids
+                    if product_id in self._rows and mask[self._rows[product_id]]}
+
+    def mask(self, plan):
+        """Evaluates the plan conditions as one combined boolean mask"""
+        combined = np.ones(self._size, dtype=bool)
+        for field, lookup, value in plan.conditions():
+            combined &= PREDICATES[lookup](self._column(field), value)
+        return combined
+
+    def stats(self):
+        """Size and memory footprint of the index, for the cache stats endpoint"""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'version': self._version,
+                'products': len(self),
+                'memory_bytes': self.memory_footprint(),
+            }
+
+    def memory_footprint(self):
+        """Returns the approximate memory used by the index, in bytes"""
+        footprint = {name: column.nbytes for name, column in self._columns.items()}
+        footprint['row_map'] = sys.getsizeof(self._rows)
+        footprint['total'] = sum(footprint.values())
+        return footprint
+
+    def __len__(self):
+        return self._size
+
+    def _column(self, name):
+        return self._columns[name][:self._size]
+
+    def _append(self, product_id):
+        """Adds a row for a new product, growing the columns geometrically"""
+        if self._size == len(self._columns['id']):
+            capacity = max(2 * self._size, 16)
+            grown = self._empty_columns(capacity)
+            for name, column in self._columns.items():
+                grown[name][:self._size] = column[:self._size]
+            self._columns = grown
+        row = self._size
+        self._columns['id'][row] = product_id
+        self._rows[product_id] = row
+        self._size += 1
+        return row
+
+    @staticmethod
+    def _empty_columns(capacity):
+        return {name: np.zeros(capacity, dtype=dtype) for name, dtype in COLUMN_TYPES.items()}
+
+    @staticmethod
+    def _category(category_id):
+        return NULL_CATEGORY if category_id is None else category_id
+
+
+catalog_index = CatalogIndex()
@@ -0,0 +1,55 @@
+from django.core.checks import Error, Tags, Warning, register
+from django.db import connections, transaction
+from django.db.models import Q
+
+from myapp.constants import CATALOG_PAGE_SIZE, CATALOG_SORTS
+
+# Filter shapes every sort has to serve from an index: label -> (filter, index also provides the order)
+SORT_CHECK_FILTERS = {
+    'unfiltered': (Q(), True),
+    'category': (Q(category_id=0), True),
+    'price range': (Q(price__gte=0, price__lte=1), False),
+}
+
+
+@register(Tags.database)
+def check_sort_indexes(app_configs, databases=None, **kwargs):
+    """
+    EXPLAINs the first page of every supported sort with sequential scans
+    disabled; a Seq Scan left in the plan means no index can serve the sort.
+    Runs with `manage.py check --database default`, PostgreSQL only.
+    """
+    from myapp.models import Product
+    from myapp.pagination import CursorPaginator
+
+    messages = []
+    for alias in databases or []:
+        connection = connections[alias]
+        if connection.vendor != 'postgresql':
+            continue
+
+        with transaction.atomic(using=alias):
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for sort, ordering in CATALOG_SORTS.items():
+                for label, (q, ordered) in SORT_CHECK_FILTERS.items():
+                    paginator = CursorPaginator(Product.objects.using(alias).filter(q), ordering=ordering)
+                    queryset = paginator.ordered()[:CATALOG_PAGE_SIZE + 1]
+                    plan = queryset.explain()
+
+                    if 'Seq Scan' in plan:
+                        messages.append(Error(
+                            f"sort={sort} ({label}) falls back to a sequential scan on myapp_product",
+                            hint=f"Add an index on ({paginator.field}, id) or check the migrations.\n{plan}",
+                            obj=Product,
+                            id='myapp.E001',
+                        ))
+                    elif ordered and any(line.strip().lstrip('-> ').startswith('Sort ') for line in plan.splitlines()):
+                        messages.append(Warning(
+                            f"sort={sort} ({label}) sorts rows in memory instead of reading an index in order",
+                            hint=plan,
+                            obj=Product,
+                            id='myapp.W001',
+                        ))
+    return messages
@@ -0,0 +1,105 @@
+"""
+Constants for the product catalog
+"""
+
+# Pagination
+CATALOG_PAGE_SIZE = 20
+
+# Sort options: public name -> ordering; each one is backed by a (key, id) index on myapp_product.
+# Product ids grow monotonically, so the newest products are the ones with the highest ids.
+CATALOG_SORTS = {
+    'price': 'price',
+    '-price': '-price',
+    'weight': 'weight',
+    'newest': '-id',
+    'popularity': '-popularity',
+}
+CATALOG_DEFAULT_ORDERING = 'id'
+
+# In-memory catalog index
+CATALOG_INDEX_CHUNK_SIZE = 5000
+
+# Facets: bucket boundaries, None means "no upper bound"
+PRICE_FACET_BUCKETS = (0, 1000, 5000, 10000, 50000, None)
+WEIGHT_FACET_BUCKETS = (0, 0.5, 1, 5, 10, None)
+FACET_CACHE_TIMEOUT = 600
+
+# Filter result cache (process-local LRU of ordered product id lists)
+FILTER_RESULT_CACHE_MAX_ENTRIES = 256
+FILTER_RESULT_CACHE_MAX_IDS = 500_000
+FILTER_RESULT_MAX_IDS_PER_ENTRY = 20_000
+
+# Category landing pages (shared cache of id lists and counts per category version)
+CATEGORY_LISTING_CACHE_TIMEOUT = 60 * 60
+
+# Catalog snapshot (process-local LRU in front of the shared cache)
+SNAPSHOT_LOCAL_MAX_ENTRIES = 5000
+SNAPSHOT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Full-text search
+SEARCH_FIELD_WEIGHTS = {'name': 3.0, 'type': 2.0, 'description': 1.0}
+SEARCH_BM25_K1 = 1.2
+SEARCH_BM25_B = 0.75
+SEARCH_TYPO_MIN_SIMILARITY = 0.25
+SEARCH_TYPO_MAX_EXPANSIONS = 3
+SEARCH_MAX_RESULTS = 1000
+SEARCH_QUERY_MAX_LENGTH = 100
+
+# Autocomplete
+AUTOCOMPLETE_DEFAULT_LIMIT = 8
+AUTOCOMPLETE_MAX_LIMIT = 20
+AUTOCOMPLETE_SCAN_LIMIT = 500
+AUTOCOMPLETE_MAX_AGE = 60
+
+# JSON catalog API: public field name -> ORM lookup
+API_PRODUCT_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'price': 'price',
+    'description': 'description',
+    'type': 'type',
+    'weight': 'weight',
+    'image': 'image',
+    'category': 'category__name',
+    'updated_at': 'updated_at',
+}
+API_DEFAULT_FIELDS = ('id', 'name', 'price', 'image')
+API_MAX_PAGE_SIZE = 100
+
+# Responsive product images
+# Placeholder served from static files for products without an upload, it never gets variants
+DEFAULT_PRODUCT_IMAGE = '/static/images/phone.jpg'
+IMAGE_VARIANT_WIDTHS = (200, 400, 800)
+IMAGE_VARIANT_FORMATS = {
+    # name: (Pillow format, extension, save options)
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+IMAGE_PIPELINE_WORKERS = 2
+IMAGE_CARD_SIZES = '(min-width: 1280px) 20vw, (min-width: 768px) 33vw, 100vw'
+
+# Bulk product import
+IMPORT_BATCH_SIZE = 1000
+IMPORT_UPDATE_FIELDS = ('name', 'price', 'description', 'type', 'weight', 'category', 'updated_at')
+
+# Batch jobs over orders skip orders younger than this, their items may still be being written
+ORDER_SETTLE_SECONDS = 300
+
+# "Frequently bought together" recommendations
+RECOMMENDATIONS_TOP_N = 8
+RECOMMENDATIONS_MIN_COOCCURRENCE = 2
+RECOMMENDATIONS_BATCH_SIZE = 5000
+RECOMMENDATIONS_JOB_NAME = 'recommendations'
+
+# Best-seller rollups: window -> number of days, ranking length, size of the catalog rails
+SALES_RANKING_WINDOWS = {'day': 1, 'week': 7, 'month': 30}
+SALES_RANKING_SIZE = 50
+SALES_RAIL_SIZE = 10
+SALES_ROLLUP_BATCH_SIZE = 5000
+SALES_ROLLUP_JOB_NAME = 'sales_rollup'
+
+# Write-behind view counters: flush period, distinct products that force an early flush,
+# and the number of unflushed views kept across failed flushes before they are dropped
+VIEW_COUNTER_FLUSH_SECONDS = 10
+VIEW_COUNTER_MAX_PENDING = 5000
+VIEW_COUNTER_MAX_RETAINED = 100_000
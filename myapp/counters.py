@@ -0,0 +1,166 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+from myapp.constants import VIEW_COUNTER_FLUSH_SECONDS, VIEW_COUNTER_MAX_PENDING, VIEW_COUNTER_MAX_RETAINED
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounterBuffer:
+    """
+    Process-local write-behind buffer for Product.view_count.
+    Views are summed per product in memory and written periodically by a
+    daemon thread as one batched UPDATE, so a popular product costs one row
+    update per flush instead of one per hit. Increments are additive, so any
+    number of worker processes can flush independently. The buffer is
+    flushed at interpreter exit and reset in forked children.
+    """
+
+    def __init__(self, flush_seconds=VIEW_COUNTER_FLUSH_SECONDS, max_pending=VIEW_COUNTER_MAX_PENDING,
+                 max_retained=VIEW_COUNTER_MAX_RETAINED):
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self.max_retained = max_retained
+        self._reset()
+        atexit.register(self.flush)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = Counter()
+        self._pid = os.getpid()
+        self._thread = None
+        self._oldest = None
+        self._stats = Counter()
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'VIEW_COUNTER_ENABLED', True)
+
+    def increment(self, product_id, views=1):
+        """Records views of a product, never touches the database"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            self._pending[product_id] += views
+            self._stats['views'] += views
+            overflow = len(self._pending) >= self.max_pending
+        self._ensure_thread()
+        if overflow:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered views with one batched UPDATE.
+        On failure the views are kept for the next flush, up to max_retained,
+        beyond that they are dropped and counted as lost.
+        :return: Number of views written.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, Counter()
+                oldest, self._oldest = self._oldest, None
+            if not pending:
+                return 0
+
+            # Views waited longer than two flush periods: the flush thread is starved or the database is slow
+            age = time.monotonic() - oldest
+            if age > 2 * self.flush_seconds:
+                with self._lock:
+                    self._stats['late_flushes'] += 1
+                logger.warning(f"View counter flush is late: views waited {age:.1f}s, {len(pending)} products pending")
+
+            try:
+                self._write(pending)
+            except Exception as e:
+                with self._lock:
+                    self._stats['failed_flushes'] += 1
+                logger.error(f"View counter flush failed: {str(e)}")
+                self._retain(pending, oldest)
+                return 0
+            finally:
+                if threading.current_thread() is self._thread:
+                    connection.close()
+
+            views = sum(pending.values())
+            with self._lock:
+                self._stats['flushes'] += 1
+                self._stats['flushed_views'] += views
+                self._stats['flushed_rows'] += len(pending)
+            return views
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending_products'] = len(self._pending)
+            stats['pending_views'] = sum(self._pending.values())
+        for key in ('views', 'flushes', 'flushed_views', 'flushed_rows', 'failed_flushes', 'late_flushes', 'lost_views'):
+            stats.setdefault(key, 0)
+        stats['pid'] = self._pid
+        return stats
+
+    def _retain(self, pending, oldest):
+        with self._lock:
+            pending.update(self._pending)
+            retained = sum(pending.values())
+            if retained > self.max_retained:
+                self._stats['lost_views'] += retained
+                logger.error(f"View counter dropped {retained} views after repeated flush failures")
+                pending, oldest = Counter(), None
+            self._pending = pending
+            self._oldest = oldest
+
+    @staticmethod
+    def _write(pending):
+        from myapp.models import Product
+
+        rows = sorted(pending.items())
+        if connection.vendor == 'postgresql':
+            table = connection.ops.quote_name(Product._meta.db_table)
+            values = ', '.join(['(%s, %s)'] * len(rows))
+            params = [value for row in rows for value in row]
+            with transaction.atomic(), connection.cursor() as cursor:
+                # The UPDATE locks rows in plan order; lock them by id first so concurrent
+                # flushes from other workers cannot deadlock on overlapping products
+                cursor.execute(
+                    f'SELECT id FROM {table} WHERE id = ANY(%s) ORDER BY id FOR UPDATE',
+                    [[product_id for product_id, _ in rows]],
+                )
+                cursor.execute(
+                    f'UPDATE {table} AS p SET view_count = p.view_count + v.views '
+                    f'FROM (VALUES {values}) AS v(id, views) WHERE p.id = v.id',
+                    params,
+                )
+            return
+
+        with transaction.atomic():
+            for product_id, views in rows:
+                Product.objects.filter(id=product_id).update(view_count=F('view_count') + views)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='view-counter-flush', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            self.flush()
+
+
+view_counter = ViewCounterBuffer()
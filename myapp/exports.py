@@ -0,0 +1,32 @@
+from category.services import CategoryService
+from djangoProject.exports import EXPORT_CHUNK_SIZE
+from myapp.models import Product
+
+# Export column -> ORM lookup, the category is joined in the same query
+PRODUCT_EXPORT_FIELDS = {
+    'id': 'id',
+    'sku': 'sku',
+    'name': 'name',
+    'price': 'price',
+    'weight': 'weight',
+    'type': 'type',
+    'description': 'description',
+    'category_id': 'category_id',
+    'category': 'category__name',
+    'updated_at': 'updated_at',
+}
+
+
+def product_export_rows(category=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Streams catalog rows through a server-side cursor.
+    :param category: Optional category name.
+    :param chunk_size: Rows fetched from the cursor per round trip.
+    :return: Tuple (columns, row iterator).
+    """
+    queryset = Product.objects.order_by('id')
+    if category:
+        queryset = queryset.filter(category_id__in=CategoryService.get_subtree_ids(category))
+
+    rows = queryset.values_list(*PRODUCT_EXPORT_FIELDS.values()).iterator(chunk_size=chunk_size)
+    return list(PRODUCT_EXPORT_FIELDS), rows
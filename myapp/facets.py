@@ -0,0 +1,115 @@
+import logging
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from category.services import CategoryService
+from myapp.Filters.FilterPlanner import FilterPlan, FilterPlanner
+from myapp.cache import CatalogVersion, make_filter_key
+from myapp.catalog_index import catalog_index
+from myapp.constants import FACET_CACHE_TIMEOUT, PRICE_FACET_BUCKETS, WEIGHT_FACET_BUCKETS
+from myapp.models import Product
+
+logger = logging.getLogger(__name__)
+
+
+class FacetService:
+    """
+    Facet counts for the catalog sidebar.
+    Each facet is counted against the other active filters (its own filter is
+    ignored), and all counts come from one conditional-aggregation query.
+    """
+
+    # facet name -> filter params that the facet replaces
+    facet_params = {
+        'category': ('category',),
+        'price': ('min_price', 'max_price'),
+        'weight': ('min_weight', 'max_weight'),
+    }
+
+    @staticmethod
+    def get_facets(filter_params):
+        """
+        Returns cached facet counts for the current filter set.
+        :param filter_params: Dictionary from CoreService.extract_filter_params.
+        :return: Dictionary with 'categories', 'price' and 'weight' lists.
+        """
+        key = make_filter_key(f'catalog:facets:{CatalogVersion.get()}', filter_params)
+        facets = cache.get(key)
+        if facets is None:
+            facets = FacetService._compute_facets(filter_params)
+            cache.set(key, facets, FACET_CACHE_TIMEOUT)
+        return facets
+
+    @staticmethod
+    def _compute_facets(filter_params):
+        planner = FilterPlanner()
+        plans = {
+            facet: planner.plan({key: value for key, value in filter_params.items() if key not in params})
+            for facet, params in FacetService.facet_params.items()
+        }
+
+        buckets = {
+            'category': [
+                # Same subtree semantics as CategoryFilter, so a count matches the results of its link
+                (name, Q(category_id__in=CategoryService.get_subtree_ids(name)))
+                for name in sorted(CategoryService.get_name_map())
+            ],
+            'price': FacetService._range_buckets('price', PRICE_FACET_BUCKETS),
+            'weight': FacetService._range_buckets('weight', WEIGHT_FACET_BUCKETS),
+        }
+
+        if catalog_index.enabled:
+            counts = FacetService._count_with_index(plans, buckets)
+        else:
+            counts = FacetService._count_with_query(plans, buckets)
+
+        return {
+            'categories': [
+                {'name': name, 'count': count}
+                for (name, _), count in zip(buckets['category'], counts['category'])
+            ],
+            'price': FacetService._range_facet(PRICE_FACET_BUCKETS, counts['price']),
+            'weight': FacetService._range_facet(WEIGHT_FACET_BUCKETS, counts['weight']),
+        }
+
+    @staticmethod
+    def _count_with_query(plans, buckets):
+        aggregates = {}
+        for facet, facet_buckets in buckets.items():
+            if plans[facet].is_empty:
+                continue
+            for i, (_, bucket_q) in enumerate(facet_buckets):
+                aggregates[f'{facet}_{i}'] = Count('id', filter=plans[facet].q & bucket_q)
+
+        result = Product.objects.aggregate(**aggregates) if aggregates else {}
+        return {
+            facet: [result.get(f'{facet}_{i}', 0) for i in range(len(facet_buckets))]
+            for facet, facet_buckets in buckets.items()
+        }
+
+    @staticmethod
+    def _count_with_index(plans, buckets):
+        return {
+            facet: [0] * len(facet_buckets) if plans[facet].is_empty else catalog_index.count_buckets(
+                plans[facet], [FilterPlan(bucket_q) for _, bucket_q in facet_buckets]
+            )
+            for facet, facet_buckets in buckets.items()
+        }
+
+    @staticmethod
+    def _range_buckets(field, boundaries):
+        buckets = []
+        for low, high in zip(boundaries, boundaries[1:]):
+            bucket_q = Q(**{f'{field}__gte': low})
+            if high is not None:
+                bucket_q &= Q(**{f'{field}__lt': high})
+            buckets.append((f'{low}-{high}', bucket_q))
+        return buckets
+
+    @staticmethod
+    def _range_facet(boundaries, counts):
+        return [
+            {'min': low, 'max': high, 'count': count}
+            for (low, high), count in zip(zip(boundaries, boundaries[1:]), counts)
+        ]
@@ -0,0 +1,149 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.exceptions import SuspiciousFileOperation
+
+from myapp.constants import (
+    DEFAULT_PRODUCT_IMAGE, IMAGE_PIPELINE_WORKERS, IMAGE_VARIANT_FORMATS, IMAGE_VARIANT_WIDTHS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def generate_variants(source_path, source_name):
+    """
+    Generates resized JPEG and WebP variants of one image.
+    Runs in a worker process, so it only depends on Pillow and the filesystem.
+    Outputs are written next to the original with content-hashed names,
+    e.g. images/phone.3f2a9c1b7d4e.400w.webp, and existing ones are reused.
+    :param source_path: Absolute path of the original image.
+    :param source_name: Storage name of the original image.
+    :return: Variants manifest to store in Product.image_variants.
+    """
+    from PIL import Image, ImageOps
+
+    with open(source_path, 'rb') as source:
+        content_hash = hashlib.sha256(source.read()).hexdigest()[:12]
+
+    directory, filename = os.path.split(source_path)
+    name_directory = os.path.dirname(source_name)
+    stem = os.path.splitext(filename)[0]
+    manifest = {'source': source_name, 'hash': content_hash}
+
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        widths = [width for width in IMAGE_VARIANT_WIDTHS if width < image.width] or [image.width]
+
+        for variant, (image_format, extension, options) in IMAGE_VARIANT_FORMATS.items():
+            manifest[variant] = {}
+            for width in widths:
+                variant_filename = f'{stem}.{content_hash}.{width}w.{extension}'
+                variant_path = os.path.join(directory, variant_filename)
+
+                if not os.path.exists(variant_path):
+                    height = max(1, round(image.height * width / image.width))
+                    resized = image.resize((width, height), Image.Resampling.LANCZOS)
+                    if image_format == 'JPEG' and resized.mode != 'RGB':
+                        resized = resized.convert('RGB')
+                    temporary_path = f'{variant_path}.tmp'
+                    resized.save(temporary_path, image_format, **options)
+                    os.replace(temporary_path, variant_path)
+
+                manifest[variant][str(width)] = f'{name_directory}/{variant_filename}' if name_directory else variant_filename
+
+    return manifest
+
+
+def is_uploaded_image(name):
+    """Whether an image name points into media storage, not at the static placeholder"""
+    return bool(name) and name != DEFAULT_PRODUCT_IMAGE and not name.startswith(('/', 'static/'))
+
+
+def get_source_path(product):
+    """Absolute path of the product image, None if it is missing or not on local storage"""
+    if not is_uploaded_image(product.image.name):
+        return None
+    try:
+        path = product.image.path
+    except (NotImplementedError, ValueError, SuspiciousFileOperation):
+        return None
+    return path if os.path.isfile(path) else None
+
+
+def needs_variants(product):
+    return is_uploaded_image(product.image.name) and product.image_variants.get('source') != product.image.name
+
+
+def save_variants(product_id, manifest):
+    """
+    Stores a manifest without firing post_save.
+    Variants only change how the product image is rendered, so instead of a
+    catalog version bump only the cached product and its category listings
+    are invalidated, and only when the manifest actually changed.
+    :return: True if the manifest was written.
+    """
+    from django.utils import timezone
+
+    from myapp.models import Product
+    from myapp.signals import bump_category_listings
+    from myapp.snapshot import catalog_snapshot
+
+    products = Product.objects.filter(pk=product_id)
+    if not products.exclude(image_variants=manifest).update(image_variants=manifest, updated_at=timezone.now()):
+        return False
+    catalog_snapshot.invalidate_product(product_id)
+    bump_category_listings(products.values_list('category_id', flat=True).first())
+    return True
+
+
+class ImagePipeline:
+    """Generates image variants on a process pool, outside the request"""
+
+    def __init__(self, max_workers=IMAGE_PIPELINE_WORKERS):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def schedule(self, product):
+        """Queues variant generation for a product once the transaction commits"""
+        from django.db import transaction
+
+        source_path = get_source_path(product)
+        if source_path is None:
+            return
+
+        product_id, source_name = product.id, product.image.name
+        transaction.on_commit(lambda: self._submit(product_id, source_path, source_name))
+
+    def _submit(self, product_id, source_path, source_name):
+        future = self._get_executor().submit(generate_variants, source_path, source_name)
+        future.add_done_callback(lambda done: self._on_done(product_id, done))
+
+    def _on_done(self, product_id, future):
+        from django.db import close_old_connections
+
+        try:
+            save_variants(product_id, future.result())
+            logger.info(f"Image variants generated for product {product_id}")
+        except Exception as e:
+            logger.error(f"Failed to generate image variants for product {product_id}: {str(e)}")
+        finally:
+            close_old_connections()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # The web worker already runs threads, forking it can deadlock the child;
+                # workers are started from a clean server process instead
+                method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context(method),
+                )
+            return self._executor
+
+
+image_pipeline = ImagePipeline()
@@ -0,0 +1,203 @@
+import csv
+import json
+import logging
+import time
+
+from django.db import transaction
+
+from cart.models import Cart
+from cart.summary import CartSummaryService
+from category.models import Category
+from djangoProject.utils import batched
+from myapp.cache import CatalogVersion, CategoryVersion
+from myapp.constants import IMPORT_BATCH_SIZE, IMPORT_UPDATE_FIELDS
+from myapp.models import Product
+
+logger = logging.getLogger(__name__)
+
+CSV = 'csv'
+JSONL = 'jsonl'
+
+
+class RowError(Exception):
+    """Raised when a feed row fails validation"""
+    pass
+
+
+def read_rows(stream, file_format):
+    """
+    Streams feed rows without loading the file.
+    :param stream: Text stream of the feed.
+    :param file_format: 'csv' or 'jsonl'.
+    :return: Generator of (line number, row dictionary or RowError).
+    """
+    if file_format == CSV:
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, RowError(f"Invalid JSON: {e.msg}")
+            continue
+        if not isinstance(row, dict):
+            yield line_number, RowError("Row must be a JSON object")
+            continue
+        yield line_number, row
+
+
+class ProductImporter:
+    """
+    Validates feed rows and upserts them by sku in batches.
+    Memory stays bounded by the batch size regardless of the feed size.
+    """
+
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE, dry_run=False, create_categories=False, error_writer=None):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.create_categories = create_categories
+        self.error_writer = error_writer
+        # Names repeat across the tree (e.g. "Cases" under two parents), so a name maps to all its ids
+        self.category_map, self.category_ids = {}, set()
+        for category_id, name in Category.objects.values_list('id', 'name'):
+            self.category_map.setdefault(name, []).append(category_id)
+            self.category_ids.add(category_id)
+        self.stats = {'read': 0, 'valid': 0, 'invalid': 0, 'upserted': 0, 'batches': 0, 'seconds': 0.0}
+
+    def run(self, rows, progress=None):
+        """
+        Imports rows produced by read_rows.
+        :param rows: Iterable of (line number, row) tuples.
+        :param progress: Optional callable receiving the stats after every batch.
+        :return: Stats dictionary.
+        """
+        started = time.monotonic()
+        for batch in batched(self._validated(rows), self.batch_size):
+            self._upsert(batch)
+            self.stats['batches'] += 1
+            self.stats['seconds'] = time.monotonic() - started
+            if progress:
+                progress(self.stats)
+
+        self.stats['seconds'] = time.monotonic() - started
+        if self.stats['upserted'] and not self.dry_run:
+            CatalogVersion.bump()
+            CategoryVersion.bump_tree()
+        return self.stats
+
+    def _validated(self, rows):
+        for line_number, row in rows:
+            self.stats['read'] += 1
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                product = self._build_product(row)
+            except RowError as e:
+                self.stats['invalid'] += 1
+                self._report(line_number, row, str(e))
+                continue
+            self.stats['valid'] += 1
+            yield product
+
+    def _build_product(self, row):
+        sku = self._text(row, 'sku', 64, required=True)
+        name = self._text(row, 'name', 100, required=True)
+        description = self._text(row, 'description', 200)
+        product_type = self._text(row, 'type', 100)
+
+        try:
+            price = int(row.get('price'))
+        except (TypeError, ValueError):
+            raise RowError("Field 'price' must be an integer")
+        if price < 0:
+            raise RowError("Field 'price' must not be negative")
+
+        try:
+            weight = float(row.get('weight') or 0)
+        except (TypeError, ValueError):
+            raise RowError("Field 'weight' must be a number")
+        if weight < 0:
+            raise RowError("Field 'weight' must not be negative")
+
+        category_id = self._category_id(row)
+
+        return Product(
+            sku=sku, name=name, price=price, description=description,
+            type=product_type, weight=weight, category_id=category_id,
+        )
+
+    def _category_id(self, row):
+        """Resolves 'category_id' if present, otherwise the 'category' name"""
+        raw_id = str(row.get('category_id') or '').strip()
+        if raw_id:
+            try:
+                category_id = int(raw_id)
+            except ValueError:
+                raise RowError("Field 'category_id' must be an integer")
+            if category_id not in self.category_ids:
+                raise RowError(f"Unknown category id {category_id}")
+            return category_id
+
+        name = str(row.get('category') or '').strip()
+        return self._resolve_category(name) if name else None
+
+    def _resolve_category(self, name):
+        category_ids = self.category_map.get(name)
+        if category_ids:
+            if len(category_ids) > 1:
+                ids = ', '.join(str(category_id) for category_id in category_ids)
+                raise RowError(f"Category '{name}' is ambiguous (ids {ids}), use 'category_id'")
+            return category_ids[0]
+        if not self.create_categories:
+            raise RowError(f"Unknown category '{name}'")
+        if self.dry_run:
+            self.category_map[name] = [None]
+            return None
+        category = Category.objects.create(name=name)
+        self.category_map[name] = [category.id]
+        self.category_ids.add(category.id)
+        logger.info(f"Created category '{name}' during import")
+        return category.id
+
+    def _upsert(self, products):
+        # A sku may repeat inside a batch; ON CONFLICT cannot touch a row twice, so keep the last one
+        unique = list({product.sku: product for product in products}.values())
+        if self.dry_run:
+            self.stats['upserted'] += len(unique)
+            return
+
+        with transaction.atomic():
+            Product.objects.bulk_create(
+                unique,
+                update_conflicts=True,
+                unique_fields=['sku'],
+                update_fields=list(IMPORT_UPDATE_FIELDS),
+            )
+        # bulk_create sends no post_save, so the cart summaries of repriced products are recomputed here
+        user_ids = list(
+            Cart.objects.filter(product__sku__in=[product.sku for product in unique])
+            .values_list('user_id', flat=True).distinct()
+        )
+        if user_ids:
+            CartSummaryService.rebuild(user_ids)
+        self.stats['upserted'] += len(unique)
+
+    def _report(self, line_number, row, message):
+        logger.debug(f"Import row {line_number} rejected: {message}")
+        if self.error_writer is not None:
+            raw = '' if isinstance(row, RowError) else json.dumps(row, ensure_ascii=False, default=str)
+            self.error_writer.writerow([line_number, message, raw])
+
+    @staticmethod
+    def _text(row, field, max_length, required=False):
+        value = str(row.get(field) or '').strip()
+        if required and not value:
+            raise RowError(f"Field '{field}' is required")
+        if len(value) > max_length:
+            raise RowError(f"Field '{field}' is longer than {max_length} characters")
+        return value
@@ -0,0 +1,67 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from myapp.cache import CatalogVersion
+from myapp.constants import DEFAULT_PRODUCT_IMAGE
+from myapp.images import generate_variants, get_source_path, needs_variants
+from myapp.models import Product
+
+
+class Command(BaseCommand):
+    help = "Generates responsive image variants for existing product images in parallel"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Worker processes")
+        parser.add_argument('--batch-size', type=int, default=200, help="Products saved per UPDATE batch")
+        parser.add_argument('--force', action='store_true', help="Regenerate variants that already exist")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        products = Product.objects.exclude(image__in=['', DEFAULT_PRODUCT_IMAGE]).only('id', 'image', 'image_variants').order_by('id')
+
+        jobs = []
+        for product in products.iterator(chunk_size=1000):
+            if not options['force'] and not needs_variants(product):
+                continue
+            source_path = get_source_path(product)
+            if source_path is None:
+                self.stderr.write(f"Product {product.id}: image file {product.image.name} not found, skipped")
+                continue
+            jobs.append((product.id, source_path, product.image.name))
+
+        self.stdout.write(f"Generating variants for {len(jobs)} products with {options['workers']} workers")
+
+        done, failed, pending = 0, 0, []
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            futures = {
+                executor.submit(generate_variants, source_path, source_name): product_id
+                for product_id, source_path, source_name in jobs
+            }
+            for future in as_completed(futures):
+                product_id = futures[future]
+                try:
+                    manifest = future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"Product {product_id}: {str(e)}")
+                    continue
+
+                pending.append(Product(id=product_id, image_variants=manifest, updated_at=timezone.now()))
+                done += 1
+                if len(pending) >= options['batch_size']:
+                    Product.objects.bulk_update(pending, ['image_variants', 'updated_at'])
+                    pending = []
+
+        if pending:
+            Product.objects.bulk_update(pending, ['image_variants', 'updated_at'])
+        if done:
+            CatalogVersion.bump()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {done} products, {failed} failed in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from myapp.cache import CatalogVersion
+from myapp.constants import RECOMMENDATIONS_BATCH_SIZE, RECOMMENDATIONS_TOP_N
+from myapp.recommendations import RecommendationBuilder
+
+
+class Command(BaseCommand):
+    help = "Builds \"frequently bought together\" recommendations from order lines"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Rebuild from the whole order history")
+        parser.add_argument('--top', type=int, default=RECOMMENDATIONS_TOP_N, help="Related products per product")
+        parser.add_argument('--batch-size', type=int, default=RECOMMENDATIONS_BATCH_SIZE, help="Rows per batch")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        stats = RecommendationBuilder(top_n=options['top'], batch_size=options['batch_size']).run(full=options['full'])
+        if stats['products']:
+            CatalogVersion.bump()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {stats['orders']} orders, {stats['products']} products re-ranked, "
+            f"watermark at order #{stats['position']} in {time.monotonic() - started:.1f}s"
+        ))
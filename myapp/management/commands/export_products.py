@@ -0,0 +1,29 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from djangoProject.exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, CSV, write_export
+from myapp.exports import product_export_rows
+
+
+class Command(BaseCommand):
+    help = "Streams the catalog joined with categories to CSV or JSONL"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', help="Output file, stdout by default")
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default=CSV, help="Export format")
+        parser.add_argument('--category', help="Only products of this category")
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE, help="Rows per cursor fetch")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        columns, rows = product_export_rows(category=options['category'], chunk_size=options['chunk_size'])
+
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as stream:
+                count = write_export(stream, columns, rows, options['format'])
+        else:
+            count = write_export(sys.stdout, columns, rows, options['format'])
+
+        self.stderr.write(f"Exported {count} products in {time.monotonic() - started:.1f}s")
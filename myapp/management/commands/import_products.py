@@ -0,0 +1,61 @@
+import csv
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from myapp.constants import IMPORT_BATCH_SIZE
+from myapp.importer import CSV, JSONL, ProductImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = "Streams a CSV or JSONL product feed into the catalog, upserting products by sku"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Feed file")
+        parser.add_argument('--format', choices=[CSV, JSONL], help="Feed format, detected from the extension by default")
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help="Rows upserted per INSERT")
+        parser.add_argument('--dry-run', action='store_true', help="Validate the feed without writing")
+        parser.add_argument('--errors', help="CSV file for rejected rows (line, error, row)")
+        parser.add_argument('--create-categories', action='store_true', help="Create unknown categories")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f"File {path} not found")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        file_format = options['format'] or (JSONL if path.endswith(('.jsonl', '.ndjson')) else CSV)
+
+        error_file = open(options['errors'], 'w', newline='', encoding='utf-8') if options['errors'] else None
+        try:
+            error_writer = None
+            if error_file is not None:
+                error_writer = csv.writer(error_file)
+                error_writer.writerow(['line', 'error', 'row'])
+
+            importer = ProductImporter(
+                batch_size=options['batch_size'],
+                dry_run=options['dry_run'],
+                create_categories=options['create_categories'],
+                error_writer=error_writer,
+            )
+            with open(path, newline='', encoding='utf-8') as stream:
+                stats = importer.run(read_rows(stream, file_format), progress=self._progress)
+        finally:
+            if error_file is not None:
+                error_file.close()
+
+        rate = stats['read'] / stats['seconds'] if stats['seconds'] else 0
+        prefix = "Dry run" if options['dry_run'] else "Done"
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}: {stats['read']} rows, {stats['upserted']} upserted, {stats['invalid']} rejected "
+            f"in {stats['seconds']:.1f}s ({rate:.0f} rows/s)"
+        ))
+
+    def _progress(self, stats):
+        rate = stats['read'] / stats['seconds'] if stats['seconds'] else 0
+        self.stdout.write(
+            f"Batch {stats['batches']}: {stats['read']} rows read, {stats['upserted']} upserted, "
+            f"{stats['invalid']} rejected ({rate:.0f} rows/s)"
+        )
@@ -1,24 +1,143 @@
 from django.db import models
 
 from category.models import Category
+from myapp.constants import DEFAULT_PRODUCT_IMAGE
 
 
 class Product(models.Model):
+    sku = models.CharField(max_length=64, unique=True, blank=True, null=True)
     name = models.CharField(max_length=100)
     price = models.IntegerField()
     description = models.CharField(max_length=200)
     type = models.CharField(max_length=100, default='')
     weight = models.FloatField(default=0.0)
-    image = models.ImageField(blank=True, upload_to='images', default='/static/images/phone.jpg')
+    image = models.ImageField(blank=True, upload_to='images', default=DEFAULT_PRODUCT_IMAGE)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products', blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Units sold, refreshed from OrderItem by the refresh_popularity command
+    popularity = models.PositiveIntegerField(default=0, editable=False)
+    # Page views, written behind by myapp.counters; deliberately unindexed so flushes stay HOT updates
+    view_count = models.PositiveBigIntegerField(default=0, editable=False)
+
+    class Meta:
+        # (sort key, id) indexes for keyset pagination of every catalog sort, alone and within a category
+        indexes = [
+            models.Index(fields=['price', 'id'], name='product_price_id_idx'),
+            models.Index(fields=['weight', 'id'], name='product_weight_id_idx'),
+            models.Index(fields=['popularity', 'id'], name='product_popularity_id_idx'),
+            models.Index(fields=['category', 'id'], name='product_category_id_idx'),
+            models.Index(fields=['category', 'price', 'id'], name='product_category_price_idx'),
+            models.Index(fields=['category', 'weight', 'id'], name='product_category_weight_idx'),
+            models.Index(fields=['category', 'popularity', 'id'], name='product_category_popular_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Category as loaded, so moving a product can invalidate both category listings
+        instance._loaded_category_id = instance.__dict__.get('category_id')
+        # Price as loaded, so a price change can refresh the cart summaries holding the product
+        instance._loaded_price = instance.__dict__.get('price')
+        return instance
+
     @property
     def image_url(self):
         if self.image:
             return self.image.url
         else:
-            return '/static/images/phone.jpg'
+            return DEFAULT_PRODUCT_IMAGE
+
+    def get_image_srcset(self, variant):
+        """srcset of the generated variants ('webp' or 'jpeg'), empty until they exist"""
+        if self.image_variants.get('source') != self.image.name:
+            return ''
+        storage = self.image.storage
+        return ', '.join(
+            f'{storage.url(name)} {width}w'
+            for width, name in sorted(self.image_variants.get(variant, {}).items(), key=lambda item: int(item[0]))
+        )
+
+    @property
+    def image_srcset(self):
+        return self.get_image_srcset('jpeg')
+
+    @property
+    def image_webp_srcset(self):
+        return self.get_image_srcset('webp')
+
+
+class ProductCooccurrence(models.Model):
+    """
+    Sparse co-occurrence matrix: number of orders containing both products.
+    The diagonal (product == other) holds the number of orders containing the product.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    other = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'other'], name='unique_product_cooccurrence'),
+        ]
+
+
+class RelatedProduct(models.Model):
+    """Precomputed top-N "frequently bought together" products, read by (product, rank)"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='related_products')
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'rank'], name='unique_related_product_rank'),
+        ]
+
+
+class JobWatermark(models.Model):
+    """Position reached by an incremental batch job, e.g. the last processed order id"""
+    name = models.CharField(max_length=100, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.name}: {self.position}'
+
+
+class ProductDailySales(models.Model):
+    """Rollup of order lines: units and revenue per product per day of Order.created"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    day = models.DateField()
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'day'], name='unique_product_daily_sales'),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'product'], name='daily_sales_day_idx'),
+        ]
+
+
+class ProductSalesRanking(models.Model):
+    """Materialized best-seller ranking of one window, rebuilt by the rollup command"""
+    DAY = 'day'
+    WEEK = 'week'
+    MONTH = 'month'
+    WINDOW_CHOICES = [(DAY, 'Day'), (WEEK, 'Week'), (MONTH, 'Month')]
+
+    window = models.CharField(max_length=10, choices=WINDOW_CHOICES)
+    rank = models.PositiveSmallIntegerField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    quantity = models.PositiveIntegerField()
+    revenue = models.DecimalField(max_digits=14, decimal_places=2)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['window', 'rank'], name='unique_sales_ranking_rank'),
+        ]
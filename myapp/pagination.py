@@ -0,0 +1,206 @@
+import base64
+import json
+import math
+
+from django.db.models import Q
+
+from djangoProject.exceptions import InvalidCursorError
+from myapp.constants import CATALOG_PAGE_SIZE
+
+NEXT = 'next'
+PREV = 'prev'
+
+
+def encode_cursor(position, direction):
+    """Encode a (sort key, id) position into an opaque url-safe cursor"""
+    payload = json.dumps({'p': position, 'd': direction}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor.
+    :param cursor: Opaque cursor string from the query string.
+    :return: A tuple of (position, direction).
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        position, direction = data['p'], data['d']
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursorError(details=cursor)
+
+    if direction not in (NEXT, PREV) or not isinstance(position, list) or len(position) != 2:
+        raise InvalidCursorError(details=cursor)
+    # Sort keys (id, price, weight, popularity) are numbers and ids are integers; anything else would fail in the ORM
+    key, pk = position
+    if not _is_number(key) or not _is_number(pk) or isinstance(pk, float):
+        raise InvalidCursorError(details=cursor)
+    return position, direction
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def cursor_query(query_dict, cursor):
+    """Build a query string that keeps the current filters and replaces the cursor"""
+    query = query_dict.copy()
+    query['cursor'] = cursor
+    return query.urlencode()
+
+
+class CursorPage:
+    """A single page of a keyset-paginated listing"""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+class CursorPaginator:
+    """
+    Keyset paginator over a stable (sort key, id) tuple.
+    Each page is a single range scan, so page N costs the same as page 1
+    and no COUNT(*) is needed.
+    """
+
+    def __init__(self, queryset, ordering='id', page_size=CATALOG_PAGE_SIZE):
+        self.queryset = queryset
+        self.descending = ordering.startswith('-')
+        self.field = ordering.lstrip('-')
+        self.page_size = page_size
+
+    def page(self, cursor=None):
+        """
+        Returns the page that follows (or precedes) the cursor position.
+        :param cursor: Opaque cursor, None for the first page.
+        :return: CursorPage instance.
+        """
+        queryset = self.queryset
+        reverse = False
+
+        if cursor:
+            position, direction = decode_cursor(cursor)
+            reverse = direction == PREV
+            queryset = queryset.filter(self._seek(position, reverse))
+
+        rows = list(queryset.order_by(*self._ordering(reverse))[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, bool(cursor)
+
+        if not rows:
+            return CursorPage([])
+
+        return CursorPage(
+            rows,
+            next_cursor=encode_cursor(self.position(rows[-1]), NEXT) if has_next else None,
+            prev_cursor=encode_cursor(self.position(rows[0]), PREV) if has_previous else None,
+        )
+
+    def ordered(self):
+        """The queryset in forward page order"""
+        return self.queryset.order_by(*self._ordering(False))
+
+    def positions(self):
+        """
+        All rows in page order, for precomputed id lists.
+        :return: Queryset of ids when ordering by id, otherwise of (sort key, id) tuples.
+        """
+        queryset = self.ordered()
+        if self.field == 'id':
+            return queryset.values_list('id', flat=True)
+        return queryset.values_list(self.field, 'id')
+
+    def position(self, item):
+        """Returns the (sort key, id) position of a model instance or a values() row"""
+        return [self._value(item, self.field), self._value(item, 'id')]
+
+    def _is_descending(self, reverse):
+        return self.descending != reverse
+
+    def _ordering(self, reverse):
+        prefix = '-' if self._is_descending(reverse) else ''
+        if self.field == 'id':
+            return [f'{prefix}id']
+        return [f'{prefix}{self.field}', f'{prefix}id']
+
+    def _seek(self, position, reverse):
+        value, pk = position
+        lookup = 'lt' if self._is_descending(reverse) else 'gt'
+        if self.field == 'id':
+            return Q(**{f'id__{lookup}': pk})
+        # key >= value bounds the (key, id) index range; the OR only resolves ties on the boundary key
+        return Q(**{f'{self.field}__{lookup}e': value}) & (
+            Q(**{f'{self.field}__{lookup}': value}) | Q(**{f'id__{lookup}': pk})
+        )
+
+    @staticmethod
+    def _value(item, field):
+        if isinstance(item, dict):
+            return item[field]
+        return getattr(item, field)
+
+
+class IdListPaginator:
+    """
+    Cursor paginator over an already ordered list of ids.
+    Cursors are compatible with CursorPaginator; keys holds the sort key of
+    every id (the ids themselves when ordering by id).
+    """
+
+    def __init__(self, ids, keys=None, page_size=CATALOG_PAGE_SIZE):
+        self.ids = ids
+        self.keys = keys if keys is not None else ids
+        self.page_size = page_size
+
+    def page(self, cursor=None):
+        """
+        Returns a CursorPage of ids.
+        Raises LookupError if the cursor points at an id that is not in the list.
+        """
+        start, end = 0, self.page_size
+        if cursor:
+            position, direction = decode_cursor(cursor)
+            try:
+                row = self.ids.index(position[1])
+            except ValueError:
+                raise LookupError(f"Cursor id {position[1]} is not in the list")
+            if direction == PREV:
+                start, end = max(row - self.page_size, 0), row
+            else:
+                start, end = row + 1, row + 1 + self.page_size
+
+        ids = list(self.ids[start:end])
+        if not ids:
+            return CursorPage([])
+
+        return CursorPage(
+            ids,
+            next_cursor=encode_cursor(self._position(end - 1), NEXT) if end < len(self.ids) else None,
+            prev_cursor=encode_cursor(self._position(start), PREV) if start > 0 else None,
+        )
+
+    def _position(self, row):
+        return [self.keys[row], self.ids[row]]
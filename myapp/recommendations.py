@@ -0,0 +1,181 @@
+import heapq
+import logging
+import math
+from collections import Counter, defaultdict
+from datetime import timedelta
+from itertools import combinations, groupby
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from djangoProject.utils import batched
+from myapp.constants import (
+    ORDER_SETTLE_SECONDS, RECOMMENDATIONS_BATCH_SIZE, RECOMMENDATIONS_JOB_NAME, RECOMMENDATIONS_MIN_COOCCURRENCE,
+    RECOMMENDATIONS_TOP_N,
+)
+from myapp.models import JobWatermark, ProductCooccurrence, RelatedProduct
+
+logger = logging.getLogger(__name__)
+
+
+class CooccurrenceMatrix:
+    """
+    Sparse symmetric product x product matrix in dictionary-of-keys form.
+    Cell (a, b) counts the orders containing both products, the diagonal
+    (a, a) counts the orders containing a.
+    """
+
+    def __init__(self):
+        self.rows = defaultdict(Counter)
+
+    def add_basket(self, product_ids):
+        """Adds the outer product of one order's indicator vector"""
+        basket = sorted(set(product_ids))
+        for product_id in basket:
+            self.rows[product_id][product_id] += 1
+        for a, b in combinations(basket, 2):
+            self.rows[a][b] += 1
+            self.rows[b][a] += 1
+
+    def update(self, other):
+        """Element-wise addition of another matrix"""
+        for product_id, row in other.rows.items():
+            self.rows[product_id].update(row)
+
+    def cells(self):
+        for product_id, row in self.rows.items():
+            for other_id, count in row.items():
+                yield product_id, other_id, count
+
+    def top_related(self, product_id, n=RECOMMENDATIONS_TOP_N, min_count=RECOMMENDATIONS_MIN_COOCCURRENCE):
+        """
+        Ranks co-purchased products by cosine similarity of their order vectors:
+        count(a, b) / sqrt(count(a) * count(b)).
+        :return: List of (related_id, score) tuples, best first.
+        """
+        row = self.rows.get(product_id)
+        if not row:
+            return []
+        own = row.get(product_id, 0)
+        scored = (
+            (other_id, count / math.sqrt(own * self.rows[other_id][other_id]))
+            for other_id, count in row.items()
+            if other_id != product_id and count >= min_count and own and self.rows[other_id][other_id]
+        )
+        return heapq.nlargest(n, scored, key=lambda item: (item[1], -item[0]))
+
+    def __len__(self):
+        return sum(len(row) for row in self.rows.values())
+
+
+class RecommendationBuilder:
+    """
+    Batch job maintaining ProductCooccurrence and RelatedProduct.
+    Incremental runs only read orders past the stored watermark, add their
+    co-occurrences to the persisted matrix and re-rank the touched products.
+    """
+
+    def __init__(self, top_n=RECOMMENDATIONS_TOP_N, batch_size=RECOMMENDATIONS_BATCH_SIZE):
+        self.top_n = top_n
+        self.batch_size = batch_size
+
+    def run(self, full=False):
+        """
+        Processes new orders, or the whole order history when full is set.
+        :return: Stats dictionary.
+        """
+        from orders.models import Order
+
+        with transaction.atomic():
+            # The locked watermark row keeps concurrent runs from merging the same orders twice
+            JobWatermark.objects.get_or_create(name=RECOMMENDATIONS_JOB_NAME)
+            watermark = JobWatermark.objects.select_for_update().get(name=RECOMMENDATIONS_JOB_NAME)
+            start = 0 if full else watermark.position
+
+            # Items are written right after their order; skip orders that may still be filling up
+            settled = timezone.now() - timedelta(seconds=ORDER_SETTLE_SECONDS)
+            end = (
+                Order.objects.filter(id__gt=start, created__lt=settled)
+                .order_by('-id').values_list('id', flat=True).first()
+            )
+            if end is None:
+                return {'orders': 0, 'products': 0, 'cells': 0, 'position': start}
+
+            delta, orders = self.read_orders(start, end)
+
+            if full:
+                ProductCooccurrence.objects.all().delete()
+                RelatedProduct.objects.all().delete()
+                matrix = delta
+                touched = set(delta.rows)
+            else:
+                matrix, touched = self.merge(delta)
+
+            self.write_cells(matrix, touched)
+            self.write_related(matrix, touched)
+            watermark.position = end
+            watermark.save(update_fields=['position', 'updated_at'])
+
+        logger.info(f"Recommendations: {orders} orders up to #{end}, {len(touched)} products re-ranked")
+        return {'orders': orders, 'products': len(touched), 'cells': len(delta), 'position': end}
+
+    def read_orders(self, start, end):
+        """Builds the co-occurrence matrix of orders in (start, end] from one streamed query"""
+        from orders.models import OrderItem
+
+        matrix, orders = CooccurrenceMatrix(), 0
+        rows = (
+            OrderItem.objects.filter(order_id__gt=start, order_id__lte=end)
+            .order_by('order_id').values_list('order_id', 'product_id')
+            .iterator(chunk_size=self.batch_size)
+        )
+        for _, basket in groupby(rows, key=lambda row: row[0]):
+            matrix.add_basket(product_id for _, product_id in basket)
+            orders += 1
+        return matrix, orders
+
+    def merge(self, delta):
+        """
+        Loads the persisted rows of the touched products (and the diagonal of
+        their neighbours) and adds the delta to them.
+        :return: Tuple (merged matrix, touched product ids).
+        """
+        touched = set(delta.rows)
+        matrix = CooccurrenceMatrix()
+        cells = ProductCooccurrence.objects.filter(product_id__in=touched)
+        for product_id, other_id, count in self._stream(cells):
+            matrix.rows[product_id][other_id] = count
+        matrix.update(delta)
+
+        neighbours = {other_id for row in matrix.rows.values() for other_id in row} - touched
+        diagonal = ProductCooccurrence.objects.filter(product_id__in=neighbours, other_id=F('product_id'))
+        for product_id, other_id, count in self._stream(diagonal):
+            matrix.rows[product_id][other_id] = count
+        return matrix, touched
+
+    def write_cells(self, matrix, touched):
+        """Upserts the matrix rows of the touched products"""
+        cells = (
+            ProductCooccurrence(product_id=product_id, other_id=other_id, count=count)
+            for product_id in touched
+            for other_id, count in matrix.rows[product_id].items()
+        )
+        for batch in batched(cells, self.batch_size):
+            ProductCooccurrence.objects.bulk_create(
+                batch, update_conflicts=True, unique_fields=['product', 'other'], update_fields=['count'],
+            )
+
+    def write_related(self, matrix, touched):
+        """Replaces the top-N lists of the touched products"""
+        RelatedProduct.objects.filter(product_id__in=touched).delete()
+        related = (
+            RelatedProduct(product_id=product_id, related_id=related_id, score=score, rank=rank)
+            for product_id in touched
+            for rank, (related_id, score) in enumerate(matrix.top_related(product_id, self.top_n))
+        )
+        for batch in batched(related, self.batch_size):
+            RelatedProduct.objects.bulk_create(batch)
+
+    def _stream(self, queryset):
+        return queryset.values_list('product_id', 'other_id', 'count').iterator(chunk_size=self.batch_size)
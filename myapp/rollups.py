@@ -0,0 +1,132 @@
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from djangoProject.utils import batched
+from myapp.constants import (
+    ORDER_SETTLE_SECONDS, SALES_RANKING_SIZE, SALES_RANKING_WINDOWS, SALES_ROLLUP_BATCH_SIZE, SALES_ROLLUP_JOB_NAME,
+)
+from myapp.models import JobWatermark, ProductDailySales, ProductSalesRanking
+from myapp.services import CoreService
+
+logger = logging.getLogger(__name__)
+
+
+class SalesRollup:
+    """
+    Incremental aggregation of order lines into ProductDailySales and the
+    windowed ProductSalesRanking tables. Each run aggregates only orders past
+    the watermark in the database, adds them to the daily rows, then rebuilds
+    the day/week/month rankings from the (much smaller) daily table.
+    """
+
+    def __init__(self, ranking_size=SALES_RANKING_SIZE, batch_size=SALES_ROLLUP_BATCH_SIZE):
+        self.ranking_size = ranking_size
+        self.batch_size = batch_size
+
+    def run(self):
+        """
+        Processes new orders and refreshes the rankings.
+        :return: Stats dictionary.
+        """
+        from orders.models import Order
+
+        with transaction.atomic():
+            # The locked watermark row keeps concurrent runs from adding the same orders twice
+            JobWatermark.objects.get_or_create(name=SALES_ROLLUP_JOB_NAME)
+            watermark = JobWatermark.objects.select_for_update().get(name=SALES_ROLLUP_JOB_NAME)
+
+            settled = timezone.now() - timedelta(seconds=ORDER_SETTLE_SECONDS)
+            end = (
+                Order.objects.filter(id__gt=watermark.position, created__lt=settled)
+                .order_by('-id').values_list('id', flat=True).first()
+            )
+
+            touched = set()
+            if end is not None:
+                touched = self.add_orders(watermark.position, end)
+                if touched:
+                    CoreService.refresh_popularity(touched)
+                watermark.position = end
+                watermark.save(update_fields=['position', 'updated_at'])
+
+            rankings = self.rebuild_rankings()
+
+        logger.info(f"Sales rollup: {len(touched)} products updated, watermark at order #{watermark.position}")
+        return {'products': len(touched), 'position': watermark.position, 'rankings': rankings}
+
+    def add_orders(self, start, end):
+        """
+        Adds the order lines of orders in (start, end] to the daily rollup.
+        :return: Set of product ids whose rows changed.
+        """
+        from orders.models import OrderItem
+
+        delta = (
+            OrderItem.objects.filter(order_id__gt=start, order_id__lte=end)
+            .annotate(day=TruncDate('order__created'))
+            .values('product_id', 'day')
+            .annotate(
+                units=Sum('quantity'),
+                amount=Sum(ExpressionWrapper(F('price') * F('quantity'), output_field=DecimalField())),
+            )
+            .order_by()
+        )
+        rows = {(row['product_id'], row['day']): (row['units'], row['amount']) for row in delta}
+        if not rows:
+            return set()
+
+        existing = ProductDailySales.objects.filter(
+            product_id__in={product_id for product_id, _ in rows},
+            day__in={day for _, day in rows},
+        )
+        for daily in existing.iterator(chunk_size=self.batch_size):
+            if (daily.product_id, daily.day) not in rows:
+                continue
+            units, amount = rows[(daily.product_id, daily.day)]
+            rows[(daily.product_id, daily.day)] = (units + daily.quantity, amount + daily.revenue)
+
+        objects = (
+            ProductDailySales(product_id=product_id, day=day, quantity=units, revenue=amount)
+            for (product_id, day), (units, amount) in rows.items()
+        )
+        for batch in batched(objects, self.batch_size):
+            ProductDailySales.objects.bulk_create(
+                batch, update_conflicts=True, unique_fields=['product', 'day'], update_fields=['quantity', 'revenue'],
+            )
+        return {product_id for product_id, _ in rows}
+
+    def rebuild_rankings(self):
+        """
+        Replaces every window's ranking with the top products of its last N days.
+        Windows whose order did not change are left untouched.
+        :return: Dictionary {window: True if the ranking changed}.
+        """
+        today = timezone.localdate()
+        rankings = {}
+        for window, days in SALES_RANKING_WINDOWS.items():
+            top = list(
+                ProductDailySales.objects.filter(day__gt=today - timedelta(days=days))
+                .values('product_id')
+                .annotate(units=Sum('quantity'), amount=Sum('revenue'))
+                .order_by('-units', '-amount', 'product_id')[:self.ranking_size]
+            )
+            current = ProductSalesRanking.objects.filter(window=window).order_by('rank')
+            if list(current.values_list('product_id', 'quantity')) == [(row['product_id'], row['units']) for row in top]:
+                rankings[window] = False
+                continue
+
+            current.delete()
+            ProductSalesRanking.objects.bulk_create(
+                ProductSalesRanking(
+                    window=window, rank=rank, product_id=row['product_id'],
+                    quantity=row['units'], revenue=row['amount'],
+                )
+                for rank, row in enumerate(top)
+            )
+            rankings[window] = True
+        return rankings
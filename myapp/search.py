@@ -0,0 +1,172 @@
+import heapq
+import logging
+import math
+import re
+from collections import Counter, defaultdict
+
+from myapp.cache import CatalogVersion, VersionedIndex
+from myapp.constants import (
+    SEARCH_BM25_B, SEARCH_BM25_K1, SEARCH_FIELD_WEIGHTS, SEARCH_MAX_RESULTS,
+    SEARCH_TYPO_MAX_EXPANSIONS, SEARCH_TYPO_MIN_SIMILARITY,
+)
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Lowercase word tokens, 'ё' folded into 'е'"""
+    return TOKEN_RE.findall((text or '').lower().replace('ё', 'е'))
+
+
+def trigrams(term):
+    padded = f'  {term} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex(VersionedIndex):
+    """
+    In-memory inverted index over Product name, description and type.
+    Documents are ranked with BM25 over field-weighted term frequencies.
+    Query terms missing from the vocabulary are expanded to similar terms
+    through a trigram index, so small typos still find products.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._reset()
+
+    def _reset(self):
+        self._postings = defaultdict(dict)
+        self._doc_terms = {}
+        self._doc_lengths = {}
+        self._total_length = 0.0
+        self._trigrams = defaultdict(set)
+
+    def build(self):
+        """Indexes all products from the database into a new index, then swaps it in"""
+        from myapp.models import Product
+
+        version = CatalogVersion.get()
+        index = SearchIndex()
+        rows = Product.objects.values_list('id', 'name', 'description', 'type')
+        for product_id, name, description, product_type in rows.iterator():
+            index._add(product_id, {'name': name, 'description': description, 'type': product_type})
+
+        with self._lock:
+            self._postings, self._doc_terms, self._trigrams = index._postings, index._doc_terms, index._trigrams
+            self._doc_lengths, self._total_length = index._doc_lengths, index._total_length
+            self._version = version
+        logger.info(f"Search index built: {len(self._doc_lengths)} products, {len(self._postings)} terms")
+
+    def upsert(self, product, version=None):
+        """Re-indexes a saved product"""
+        with self._lock:
+            if self._version is None:
+                return
+            self._remove(product.id)
+            self._add(product.id, {'name': product.name, 'description': product.description, 'type': product.type})
+            self._follow(version)
+
+    def remove(self, product_id, version=None):
+        """Drops a deleted product from the index"""
+        with self._lock:
+            if self._version is None:
+                return
+            self._remove(product_id)
+            self._follow(version)
+
+    def search(self, query, limit=SEARCH_MAX_RESULTS):
+        """
+        Ranks products for a free-text query.
+        :param query: Raw query string.
+        :param limit: Maximum number of results.
+        :return: List of (product_id, score) tuples, best match first.
+        """
+        self.ensure_built()
+        with self._lock:
+            if not self._doc_lengths:
+                return []
+
+            doc_count = len(self._doc_lengths)
+            average_length = self._total_length / doc_count
+            scores = defaultdict(float)
+
+            for term, weight in self._expand(tokenize(query)):
+                postings = self._postings[term]
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for product_id, frequency in postings.items():
+                    norm = 1 - SEARCH_BM25_B + SEARCH_BM25_B * self._doc_lengths[product_id] / average_length
+                    scores[product_id] += weight * idf * frequency * (SEARCH_BM25_K1 + 1) / (
+                        frequency + SEARCH_BM25_K1 * norm
+                    )
+
+        return heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+
+    def _expand(self, terms):
+        """Yields (term, weight): exact terms, or trigram-similar terms for unknown ones"""
+        for term in dict.fromkeys(terms):
+            if term in self._postings:
+                yield term, 1.0
+                continue
+
+            query_trigrams = trigrams(term)
+            shared = Counter()
+            for trigram in query_trigrams:
+                shared.update(self._trigrams.get(trigram, ()))
+
+            candidates = []
+            for candidate, common in shared.items():
+                similarity = common / len(query_trigrams | trigrams(candidate))
+                if similarity >= SEARCH_TYPO_MIN_SIMILARITY:
+                    candidates.append((similarity, candidate))
+
+            for similarity, candidate in heapq.nlargest(SEARCH_TYPO_MAX_EXPANSIONS, candidates):
+                yield candidate, similarity
+
+    def _add(self, product_id, fields):
+        frequencies = Counter()
+        for field, text in fields.items():
+            for term in tokenize(text):
+                frequencies[term] += SEARCH_FIELD_WEIGHTS[field]
+
+        for term, frequency in frequencies.items():
+            if term not in self._postings:
+                for trigram in trigrams(term):
+                    self._trigrams[trigram].add(term)
+            self._postings[term][product_id] = frequency
+
+        length = sum(frequencies.values())
+        self._doc_terms[product_id] = list(frequencies)
+        self._doc_lengths[product_id] = length
+        self._total_length += length
+
+    def _remove(self, product_id):
+        for term in self._doc_terms.pop(product_id, ()):
+            postings = self._postings[term]
+            postings.pop(product_id, None)
+            if not postings:
+                del self._postings[term]
+                for trigram in trigrams(term):
+                    self._trigrams[trigram].discard(term)
+        self._total_length -= self._doc_lengths.pop(product_id, 0)
+
+
+search_index = SearchIndex()
+
+
+def warm_search_index():
+    """
+    Builds the search index when a web worker starts, so the first q= request does not pay for it.
+    Called from the WSGI/ASGI entry points, never from migrate or other management commands.
+    """
+    from django.db import connections
+
+    try:
+        search_index.ensure_built()
+    except Exception as e:
+        logger.error(f"Search index warm-up failed, it will be built on first use: {str(e)}")
+    finally:
+        # A preloading server imports the entry point in the master and forks workers afterwards
+        connections.close_all()
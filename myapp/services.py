@@ -1,5 +1,25 @@
-from myapp.Filters.FilterFactory import FilterFactory
-from myapp.models import Product
+import logging
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from category.services import CategoryService
+from djangoProject.exceptions import ProductNotFoundError
+from myapp.Filters.FilterPlanner import FilterPlanner
+from myapp.cache import CatalogVersion, CategoryVersion, filter_result_cache, make_filter_key
+from myapp.catalog_index import catalog_index
+from myapp.constants import (
+    CATALOG_DEFAULT_ORDERING, CATALOG_PAGE_SIZE, CATALOG_SORTS, CATEGORY_LISTING_CACHE_TIMEOUT,
+    FILTER_RESULT_MAX_IDS_PER_ENTRY, SALES_RAIL_SIZE, SEARCH_QUERY_MAX_LENGTH,
+)
+from myapp.models import Product, RelatedProduct
+from myapp.pagination import CursorPage, CursorPaginator, IdListPaginator
+from myapp.search import search_index
+from myapp.snapshot import catalog_snapshot
+
+logger = logging.getLogger(__name__)
 
 
 class CoreService:
@@ -21,16 +41,231 @@ class CoreService:
 
         return filter_params
 
+    @staticmethod
+    def extract_search_query(request):
+        """Returns the stripped 'q' parameter or None"""
+        query = request.GET.get('q', '').strip()[:SEARCH_QUERY_MAX_LENGTH]
+        return query or None
+
+    @staticmethod
+    def extract_ordering(request):
+        """Maps the 'sort' parameter to an ordering, unknown values fall back to the default"""
+        return CATALOG_SORTS.get(request.GET.get('sort'), CATALOG_DEFAULT_ORDERING)
+
     @staticmethod
     def _convert_param(value, converter):
         return converter(value) if value else None
 
+    @staticmethod
+    def get_filter_plan(filter_params):
+        """Compiles filter params into a single FilterPlan"""
+        plan = FilterPlanner().plan(filter_params)
+        logger.debug(f"Catalog filter plan: {plan}")
+        return plan
+
     @staticmethod
     def get_filtred_products(filter_params):
-        filters = FilterFactory().create_filters(filter_params)
+        plan = CoreService.get_filter_plan(filter_params)
+
+        if plan.is_empty:
+            return Product.objects.none()
+        return Product.objects.filter(plan.q)
+
+    @staticmethod
+    def get_products_page(filter_params, cursor=None, page_size=CATALOG_PAGE_SIZE, query=None,
+                          ordering=CATALOG_DEFAULT_ORDERING):
+        """
+        Returns one keyset-paginated page of filtered products.
+        :param filter_params: Dictionary from extract_filter_params.
+        :param cursor: Opaque cursor from the previous page, None for the first page.
+        :param page_size: Number of products per page.
+        :param query: Optional search query, results are then ordered by relevance.
+        :param ordering: Value of CATALOG_SORTS, ignored for search results.
+        :return: CursorPage instance.
+        """
+        plan = CoreService.get_filter_plan(filter_params)
+        if plan.is_empty:
+            return CursorPage([])
 
-        items = Product.objects.all()
+        if query:
+            return CoreService.search_products_page(query, plan, cursor, page_size)
 
-        for filter_instance in filters:
-            items = filter_instance.apply_filter(items)
-        return items
+        if catalog_index.enabled and catalog_index.supports(plan, ordering):
+            page = catalog_index.page(plan, cursor, ordering=ordering, page_size=page_size)
+            page.items = CoreService.get_products_by_ids(page.items)
+            return page
+
+        items = Product.objects.filter(plan.q)
+        paginator = CursorPaginator(items, ordering=ordering, page_size=page_size)
+
+        cached = filter_result_cache.get_ids(
+            filter_params,
+            lambda: paginator.positions()[:FILTER_RESULT_MAX_IDS_PER_ENTRY + 1],
+            ordering=ordering,
+        )
+        if cached is not None:
+            ids, keys = cached
+            try:
+                page = IdListPaginator(ids, keys=keys, page_size=page_size).page(cursor)
+                page.items = CoreService.get_products_by_ids(page.items)
+                return page
+            except LookupError:
+                logger.debug("Cursor is not in the cached result, falling back to keyset query")
+
+        return paginator.page(cursor)
+
+    @staticmethod
+    def search_products(query, plan):
+        """
+        Ranks products for the query and keeps those matching the filter plan.
+        :return: List of (product_id, score) tuples, best match first.
+        """
+        results = search_index.search(query)
+        if not results or not plan.q.children:
+            return results
+
+        if catalog_index.enabled and catalog_index.supports(plan):
+            allowed = catalog_index.filter_ids(plan, [product_id for product_id, _ in results])
+        else:
+            allowed = set(
+                Product.objects.filter(plan.q, id__in=[product_id for product_id, _ in results])
+                .values_list('id', flat=True)
+            )
+        return [(product_id, score) for product_id, score in results if product_id in allowed]
+
+    @staticmethod
+    def search_products_page(query, plan, cursor=None, page_size=CATALOG_PAGE_SIZE):
+        """Returns a page of search results ordered by relevance"""
+        results = CoreService.search_products(query, plan)
+        ids = [product_id for product_id, _ in results]
+        scores = [round(score, 6) for _, score in results]
+
+        paginator = IdListPaginator(ids, keys=scores, page_size=page_size)
+        try:
+            page = paginator.page(cursor)
+        except LookupError:
+            page = paginator.page()
+        page.items = CoreService.get_products_by_ids(page.items)
+        return page
+
+    @staticmethod
+    def get_products_by_ids(product_ids):
+        """Reads products through the catalog snapshot, keeping the order of the ids"""
+        return catalog_snapshot.get_products(product_ids)
+
+    @staticmethod
+    def get_product(product_id):
+        """Reads one product through the catalog snapshot"""
+        product = catalog_snapshot.get_product(product_id)
+        if product is None:
+            raise ProductNotFoundError(details={'product_id': product_id})
+        return product
+
+    @staticmethod
+    def get_related_products(product_id):
+        """Precomputed "frequently bought together" products, one (product, rank) index lookup"""
+        related_ids = list(
+            RelatedProduct.objects.filter(product_id=product_id).order_by('rank').values_list('related_id', flat=True)
+        )
+        return CoreService.get_products_by_ids(related_ids)
+
+    @staticmethod
+    def get_sales_ranking(window, limit=SALES_RAIL_SIZE):
+        """Best sellers of a window ('day', 'week' or 'month') from the materialized ranking"""
+        return CoreService.get_products_by_ids(catalog_snapshot.get_ranking(window)[:limit])
+
+    @staticmethod
+    def refresh_popularity(product_ids=None):
+        """
+        Recomputes Product.popularity (units sold) from OrderItem in one UPDATE.
+        This is the only writer of the counter; only rows whose counter changed are written.
+        :param product_ids: Products to refresh, all products if None.
+        :return: Number of updated products.
+        """
+        from orders.models import OrderItem
+
+        sold = Coalesce(Subquery(
+            OrderItem.objects.filter(product=OuterRef('pk'))
+            .values('product').annotate(total=Sum('quantity')).values('total')
+        ), 0)
+        products = Product.objects.all() if product_ids is None else Product.objects.filter(id__in=product_ids)
+        updated = products.exclude(popularity=sold).update(popularity=sold)
+        if updated:
+            transaction.on_commit(CatalogVersion.bump)
+            transaction.on_commit(CategoryVersion.bump_tree)
+        logger.info(f"Popularity refreshed for {updated} products")
+        return updated
+
+
+class CategoryPageService:
+    """
+    Product listings of category landing pages.
+    The ordered id list and the counts of a listing are cached in the shared
+    cache under the category's own version, so a product write only
+    invalidates the listings of the categories it touches.
+    """
+
+    @staticmethod
+    def get_page(category_id, filter_params, cursor=None, page_size=CATALOG_PAGE_SIZE,
+                 ordering=CATALOG_DEFAULT_ORDERING):
+        """
+        Returns one page of the category listing (the category and its subcategories).
+        :param category_id: Id of the category.
+        :param filter_params: Dictionary from CoreService.extract_filter_params, the category is ignored.
+        :param cursor: Opaque cursor from the previous page, None for the first page.
+        :param page_size: Number of products per page.
+        :param ordering: Value of CATALOG_SORTS.
+        :return: Tuple (CursorPage, listing dictionary with 'total' and 'children').
+        """
+        filter_params = {**filter_params, 'category': None}
+        plan = CoreService.get_filter_plan(filter_params)
+        if plan.is_empty:
+            return CursorPage([]), {'ids': [], 'keys': None, 'total': 0, 'children': []}
+
+        queryset = Product.objects.filter(plan.q, category_id__in=CategoryService.get_descendant_ids(category_id))
+        paginator = CursorPaginator(queryset, ordering=ordering, page_size=page_size)
+        listing = CategoryPageService.get_listing(category_id, {**filter_params, 'ordering': ordering}, paginator)
+
+        if listing['ids'] is not None:
+            try:
+                page = IdListPaginator(listing['ids'], keys=listing['keys'], page_size=page_size).page(cursor)
+                page.items = CoreService.get_products_by_ids(page.items)
+                return page, listing
+            except LookupError:
+                logger.debug("Cursor is not in the cached category listing, falling back to keyset query")
+
+        return paginator.page(cursor), listing
+
+    @staticmethod
+    def get_listing(category_id, filter_params, paginator):
+        """
+        Returns the cached listing of a category, computing it on a miss.
+        :return: Dictionary {'ids': ordered ids or None if too many, 'keys': sort keys or None
+                 when ordering by id, 'total': int, 'children': [{'id', 'name', 'count'}]}.
+        """
+        key = make_filter_key(f'category:listing:{category_id}:{CategoryVersion.get(category_id)}', filter_params)
+        listing = cache.get(key)
+        if listing is not None:
+            return listing
+
+        rows = list(paginator.positions()[:FILTER_RESULT_MAX_IDS_PER_ENTRY + 1])
+        if paginator.field == 'id':
+            ids, keys = rows, None
+        else:
+            ids, keys = [row[1] for row in rows], [row[0] for row in rows]
+        counts = dict(paginator.queryset.order_by().values_list('category_id').annotate(count=Count('id')))
+
+        children = []
+        for node in CategoryService.get_nodes():
+            if node['parent_id'] == category_id:
+                count = sum(counts.get(child_id, 0) for child_id in CategoryService.get_descendant_ids(node['id']))
+                children.append({'id': node['id'], 'name': node['name'], 'count': count})
+
+        listing = {
+            'ids': ids if len(ids) <= FILTER_RESULT_MAX_IDS_PER_ENTRY else None,
+            'keys': keys if len(ids) <= FILTER_RESULT_MAX_IDS_PER_ENTRY else None,
+            'total': sum(counts.values()),
+            'children': children,
+        }
+        cache.set(key, listing, CATEGORY_LISTING_CACHE_TIMEOUT)
+        return listing
@@ -0,0 +1,56 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from myapp.autocomplete import autocomplete_index
+from category.services import CategoryService
+from myapp.cache import CatalogVersion, CategoryVersion
+from myapp.catalog_index import catalog_index
+from myapp.images import image_pipeline, needs_variants
+from myapp.models import Product
+from myapp.search import search_index
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, **kwargs):
+    category_ids = (instance.category_id, getattr(instance, '_loaded_category_id', None))
+    instance._loaded_category_id = instance.category_id
+    # Publish after commit: a process rebuilding under the new version must see the row,
+    # and a rolled-back save must not reach the local indexes
+    transaction.on_commit(lambda: publish_product_saved(instance, category_ids))
+
+    if needs_variants(instance):
+        image_pipeline.schedule(instance)
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    # The instance loses its pk once the delete finishes, keep what the callback needs
+    product_id, category_id = instance.id, instance.category_id
+    transaction.on_commit(lambda: publish_product_deleted(product_id, category_id))
+
+
+def publish_product_saved(product, category_ids):
+    version = CatalogVersion.bump()
+    catalog_index.upsert(product, version)
+    search_index.upsert(product, version)
+    autocomplete_index.upsert(product, version)
+    bump_category_listings(*category_ids)
+
+
+def publish_product_deleted(product_id, category_id):
+    version = CatalogVersion.bump()
+    catalog_index.remove(product_id, version)
+    search_index.remove(product_id, version)
+    autocomplete_index.remove(product_id, version)
+    bump_category_listings(category_id)
+
+
+def bump_category_listings(*category_ids):
+    """Invalidates the listings of the given categories and their ancestors"""
+    lineage = set()
+    for category_id in category_ids:
+        if category_id is not None:
+            lineage.update(CategoryService.get_lineage_ids(category_id))
+    if lineage:
+        CategoryVersion.bump(lineage)
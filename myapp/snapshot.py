@@ -0,0 +1,101 @@
+import logging
+
+from django.core.cache import cache
+
+from myapp.cache import CatalogVersion, LRUCache
+from myapp.constants import SNAPSHOT_CACHE_TIMEOUT, SNAPSHOT_LOCAL_MAX_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogSnapshot:
+    """
+    Versioned read-through snapshot of the catalog.
+    Lookups go to a process-local LRU first, then to the shared Django cache,
+    and only then to the database. Keys embed the catalog version, so a
+    version bump from the model signals invalidates every layer at once.
+    """
+
+    def __init__(self):
+        self._local = LRUCache(SNAPSHOT_LOCAL_MAX_ENTRIES)
+
+    def get_product(self, product_id):
+        """Returns a product with its category preloaded, or None"""
+        products = self.get_products([product_id])
+        return products[0] if products else None
+
+    def get_products(self, product_ids):
+        """
+        Returns products in the order of the given ids, skipping unknown ids.
+        :param product_ids: Iterable of product ids.
+        :return: List of Product instances.
+        """
+        from myapp.models import Product
+
+        product_ids = list(product_ids)
+        version = CatalogVersion.get()
+        keys = {product_id: self._key(version, f'product:{product_id}') for product_id in product_ids}
+
+        found = {}
+        for product_id, key in keys.items():
+            product = self._local.get(key)
+            if product is not None:
+                found[product_id] = product
+
+        missing = [product_id for product_id in product_ids if product_id not in found]
+        if missing:
+            shared = cache.get_many([keys[product_id] for product_id in missing])
+            for product_id in missing:
+                product = shared.get(keys[product_id])
+                if product is not None:
+                    found[product_id] = product
+                    self._local.set(keys[product_id], product)
+
+        missing = [product_id for product_id in product_ids if product_id not in found]
+        if missing:
+            loaded = Product.objects.select_related('category').in_bulk(missing)
+            cache.set_many(
+                {keys[product_id]: product for product_id, product in loaded.items()},
+                SNAPSHOT_CACHE_TIMEOUT,
+            )
+            for product_id, product in loaded.items():
+                found[product_id] = product
+                self._local.set(keys[product_id], product)
+
+        return [found[product_id] for product_id in product_ids if product_id in found]
+
+    def invalidate_product(self, product_id):
+        """Drops one product from the shared cache and from the local LRU of this process"""
+        key = self._key(CatalogVersion.get(), f'product:{product_id}')
+        cache.delete(key)
+        self._local.delete(key)
+
+    def get_ranking(self, window):
+        """Returns the product ids of a materialized sales ranking, best seller first"""
+        from myapp.models import ProductSalesRanking
+
+        return self._read(f'ranking:{window}', lambda: list(
+            ProductSalesRanking.objects.filter(window=window).order_by('rank').values_list('product_id', flat=True)
+        ))
+
+    def stats(self):
+        return self._local.stats()
+
+    def _read(self, name, load):
+        key = self._key(CatalogVersion.get(), name)
+        value = self._local.get(key)
+        if value is None:
+            value = cache.get(key)
+            if value is None:
+                value = load()
+                cache.set(key, value, SNAPSHOT_CACHE_TIMEOUT)
+                logger.info(f"Catalog snapshot '{name}' loaded from the database")
+            self._local.set(key, value)
+        return value
+
+    @staticmethod
+    def _key(version, name):
+        return f'catalog:snapshot:{version}:{name}'
+
+
+catalog_snapshot = CatalogSnapshot()
@@ -0,0 +1,216 @@
+from django.core.cache import cache
+from django.db.models import Q
+from django.test import TestCase
+
+from category.models import Category
+from djangoProject.exceptions import InvalidCursorError
+from myapp.Filters.FilterPlanner import FilterPlanner
+from myapp.catalog_index import catalog_index
+from myapp.counters import ViewCounterBuffer
+from myapp.facets import FacetService
+from myapp.images import get_source_path, needs_variants
+from myapp.models import Product
+from myapp.pagination import NEXT, PREV, CursorPaginator, decode_cursor, encode_cursor
+
+
+class ProductImageTest(TestCase):
+    def test_product_without_upload_saves(self):
+        product = Product.objects.create(name='Phone', price=100, description='')
+        product.price = 120
+        product.save()
+
+        self.assertFalse(needs_variants(product))
+        self.assertIsNone(get_source_path(product))
+        self.assertEqual(product.image_srcset, '')
+
+
+class CatalogTestCase(TestCase):
+    """A small catalog with a two-level category tree and repeated sort keys"""
+
+    def setUp(self):
+        cache.clear()
+        self.phones = Category.objects.create(name='Phones')
+        self.smartphones = Category.objects.create(name='Smartphones', parent=self.phones)
+        self.laptops = Category.objects.create(name='Laptops')
+        rows = [
+            (100, 0.2, self.phones), (100, 0.3, self.smartphones), (100, 0.3, self.laptops),
+            (2500, 0.5, self.smartphones), (2500, 1.5, self.laptops), (7000, 0.5, None),
+            (7000, 2.0, self.smartphones), (7000, 12.0, self.laptops), (60000, 3.0, self.laptops),
+        ]
+        self.products = [
+            Product.objects.create(name=f'Product {i}', price=price, weight=weight, category=category, description='')
+            for i, (price, weight, category) in enumerate(rows)
+        ]
+
+
+class CursorTest(TestCase):
+    def test_round_trip(self):
+        for position, direction in (([1, 2], NEXT), ([2500, 7], PREV), ([0.5, 3], NEXT)):
+            self.assertEqual(decode_cursor(encode_cursor(position, direction)), (position, direction))
+
+    def test_invalid_cursors_are_rejected(self):
+        cursors = [
+            'not a cursor',
+            encode_cursor([1, 2], 'sideways'),
+            encode_cursor([1, 2, 3], NEXT),
+            encode_cursor(['1', 2], NEXT),
+            encode_cursor([1, 2.5], NEXT),
+            encode_cursor([True, 2], NEXT),
+            encode_cursor([1, None], NEXT),
+        ]
+        for cursor in cursors:
+            with self.assertRaises(InvalidCursorError):
+                decode_cursor(cursor)
+
+
+class CursorPaginatorTest(CatalogTestCase):
+    def walk(self, paginator):
+        pages, page = [], paginator.page()
+        pages.append(page.items)
+        while page.has_next:
+            page = paginator.page(page.next_cursor)
+            pages.append(page.items)
+        return pages
+
+    def test_pages_follow_ordering_with_ties(self):
+        for ordering in ('id', 'price', '-price', 'weight', '-weight'):
+            with self.subTest(ordering=ordering):
+                paginator = CursorPaginator(Product.objects.all(), ordering=ordering, page_size=2)
+                expected = list(paginator.ordered())
+
+                pages = self.walk(paginator)
+
+                self.assertEqual([product for page in pages for product in page], expected)
+                self.assertTrue(all(len(page) == 2 for page in pages[:-1]))
+
+    def test_previous_pages_match_forward_pages(self):
+        paginator = CursorPaginator(Product.objects.all(), ordering='price', page_size=2)
+        forward = self.walk(paginator)
+
+        page = paginator.page(encode_cursor(paginator.position(forward[-1][0]), PREV))
+        backward = [page.items]
+        while page.has_previous:
+            page = paginator.page(page.prev_cursor)
+            backward.append(page.items)
+
+        self.assertEqual(backward[::-1], forward[:-1])
+
+
+class FilterPlannerTest(CatalogTestCase):
+    def expected(self, predicate):
+        return sorted(product.id for product in self.products if predicate(product))
+
+    def planned(self, filter_params):
+        plan = FilterPlanner().plan(filter_params)
+        self.assertFalse(plan.is_empty)
+        return sorted(Product.objects.filter(plan.q).values_list('id', flat=True))
+
+    def test_plan_matches_filters(self):
+        phones = self.phones.path
+        cases = [
+            ({}, lambda p: True),
+            ({'min_price': 2500}, lambda p: p.price >= 2500),
+            ({'min_price': 100, 'max_price': 7000}, lambda p: 100 <= p.price <= 7000),
+            ({'min_weight': 0.5, 'max_weight': 3.0}, lambda p: 0.5 <= p.weight <= 3.0),
+            ({'category': 'Phones'}, lambda p: p.category is not None and p.category.path.startswith(phones)),
+            ({'category': 'Smartphones', 'max_price': 2500}, lambda p: p.category == self.smartphones and p.price <= 2500),
+            ({'category': 'Laptops', 'min_price': None, 'min_weight': 1.0}, lambda p: p.category == self.laptops and p.weight >= 1.0),
+        ]
+        for filter_params, predicate in cases:
+            with self.subTest(filter_params=filter_params):
+                self.assertEqual(self.planned(filter_params), self.expected(predicate))
+
+    def test_contradictions_are_empty(self):
+        planner = FilterPlanner()
+        self.assertTrue(planner.plan({'min_price': 7000, 'max_price': 100}).is_empty)
+        self.assertTrue(planner.plan({'min_weight': 2.0, 'max_weight': 1.0}).is_empty)
+        self.assertTrue(planner.plan({'category': 'Tablets'}).is_empty)
+
+
+class CatalogIndexCountTest(CatalogTestCase):
+    filter_sets = [
+        {},
+        {'min_price': 2500},
+        {'category': 'Phones', 'max_price': 7000},
+        {'category': 'Laptops', 'min_weight': 1.0, 'max_weight': 12.0},
+        {'min_price': 60000, 'max_price': 100},
+    ]
+
+    def setUp(self):
+        super().setUp()
+        catalog_index.build()
+
+    def test_index_counts_match_orm(self):
+        planner = FilterPlanner()
+        for filter_params in self.filter_sets:
+            with self.subTest(filter_params=filter_params):
+                plan = planner.plan(filter_params)
+                if plan.is_empty:
+                    continue
+                self.assertEqual(catalog_index.count(plan), Product.objects.filter(plan.q).count())
+
+    def test_facet_counts_match_orm(self):
+        planner = FilterPlanner()
+        for filter_params in self.filter_sets:
+            with self.subTest(filter_params=filter_params):
+                plans = {
+                    facet: planner.plan({key: value for key, value in filter_params.items() if key not in params})
+                    for facet, params in FacetService.facet_params.items()
+                }
+                buckets = {
+                    'category': [(name, Q(category_id__in=[category.id]))
+                                 for name, category in (('Phones', self.phones), ('Laptops', self.laptops))],
+                    'price': FacetService._range_buckets('price', (0, 1000, 5000, None)),
+                    'weight': FacetService._range_buckets('weight', (0, 0.5, 5, None)),
+                }
+
+                self.assertEqual(
+                    FacetService._count_with_index(plans, buckets),
+                    FacetService._count_with_query(plans, buckets),
+                )
+
+    def test_category_facet_counts_subtree(self):
+        facets = FacetService._compute_facets({})
+
+        counts = {facet['name']: facet['count'] for facet in facets['categories']}
+        self.assertEqual(counts, {'Phones': 4, 'Smartphones': 3, 'Laptops': 4})
+
+
+class ViewCounterBufferTest(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        # A long period keeps the flush thread asleep, the test flushes by hand
+        self.buffer = ViewCounterBuffer(flush_seconds=3600)
+
+    def test_flush_adds_buffered_views(self):
+        first, second = self.products[:2]
+        Product.objects.filter(id=first.id).update(view_count=10)
+        self.buffer.increment(first.id)
+        self.buffer.increment(first.id, views=4)
+        self.buffer.increment(second.id, views=2)
+
+        self.assertEqual(self.buffer.flush(), 7)
+        self.assertEqual(self.buffer.flush(), 0)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.view_count, second.view_count), (15, 2))
+        stats = self.buffer.stats()
+        self.assertEqual(
+            {key: stats[key] for key in ('views', 'flushes', 'flushed_views', 'flushed_rows', 'pending_views')},
+            {'views': 7, 'flushes': 1, 'flushed_views': 7, 'flushed_rows': 2, 'pending_views': 0},
+        )
+
+    def test_failed_flush_keeps_views(self):
+        product = self.products[0]
+        self.buffer.increment(product.id, views=3)
+        self.buffer._write = lambda pending: 1 / 0
+
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.buffer.stats()['pending_views'], 3)
+
+        del self.buffer._write
+        self.assertEqual(self.buffer.flush(), 3)
+        product.refresh_from_db()
+        self.assertEqual(product.view_count, 3)
+        self.assertEqual(self.buffer.stats()['failed_flushes'], 1)
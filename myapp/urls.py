@@ -1,7 +1,8 @@
 
 from django.urls import path
 
-from myapp.views import index, id_item
+from myapp import api
+from myapp.views import index, id_item, cache_stats, search, autocomplete, export_products
 
 app_name = 'myapp'
 urlpatterns = [
@@ -9,4 +10,16 @@ urlpatterns = [
 
     path('myapp/<int:id>/', id_item, name='id_item'),
 
+    path('myapp/search/', search, name='search'),
+
+    path('myapp/autocomplete/', autocomplete, name='autocomplete'),
+
+    path('myapp/cache-stats/', cache_stats, name='cache_stats'),
+
+    path('myapp/export/products/', export_products, name='export_products'),
+
+    path('api/v1/products/', api.product_list, name='api_product_list'),
+
+    path('api/v1/products/<int:id>/', api.product_detail, name='api_product_detail'),
+
 ]
@@ -1,30 +1,180 @@
-from django.shortcuts import render, get_object_or_404
-from category.models import Category
-from myapp.models import Product
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, JsonResponse
+from django.shortcuts import render
+from django.urls import reverse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from djangoProject.decorators import handler_api_errors
+from djangoProject.exports import parse_export_format, streaming_export_response
+from djangoProject.exceptions import InvalidCursorError, ProductNotFoundError, ValidationError
+from djangoProject.versions import UserStateVersion
+from myapp.autocomplete import autocomplete_index, CATEGORY
+from myapp.cache import CatalogVersion, filter_result_cache
+from myapp.catalog_index import catalog_index
+from myapp.constants import (
+    AUTOCOMPLETE_DEFAULT_LIMIT, AUTOCOMPLETE_MAX_AGE, AUTOCOMPLETE_MAX_LIMIT, IMAGE_CARD_SIZES
+)
+from myapp.counters import view_counter
+from myapp.exports import product_export_rows
+from myapp.facets import FacetService
+from myapp.models import ProductSalesRanking
+from myapp.pagination import cursor_query
 from myapp.services import CoreService
+from myapp.snapshot import catalog_snapshot
+
+
+def _page_etag(request, *parts):
+    """
+    ETag of a catalog page: catalog version, the user's favorites and cart
+    versions (rendered in the navbar) and the exact URL.
+    """
+    from cart.services import CartService
+    from favorites.services import FavoriteService
+
+    return UserStateVersion.digest([
+        CatalogVersion.get(),
+        FavoriteService.get_favorites_version(request),
+        CartService.get_cart_version(request),
+        request.user.pk,
+        request.get_full_path(),
+        *parts,
+    ])
+
+
+def _index_etag(request):
+    return _page_etag(request)
+
 
+def _index_last_modified(request):
+    return CatalogVersion.get_modified()
 
+
+def _item_etag(request, id):
+    return _page_etag(request, id)
+
+
+def _item_last_modified(request, id):
+    try:
+        return CoreService.get_product(id).updated_at
+    except ProductNotFoundError:
+        return None
+
+
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_index_etag, last_modified_func=_index_last_modified)
 def index(request):
 
     filter_params = CoreService.extract_filter_params(request)
+    query = CoreService.extract_search_query(request)
+
+    ordering = CoreService.extract_ordering(request)
+
+    try:
+        page = CoreService.get_products_page(filter_params, request.GET.get('cursor'), query=query, ordering=ordering)
+    except InvalidCursorError:
+        page = CoreService.get_products_page(filter_params, query=query, ordering=ordering)
 
-    items = CoreService.get_filtred_products(filter_params)
-    
     from favorites.services import FavoriteService
     favorites_ids = FavoriteService.get_favorites_ids(request)
 
     context = {
-        'items': items,
-        'categories': Category.objects.all(),
+        'items': page.items,
+        'page': page,
+        'next_query': cursor_query(request.GET, page.next_cursor) if page.has_next else None,
+        'prev_query': cursor_query(request.GET, page.prev_cursor) if page.has_previous else None,
+        'facets': FacetService.get_facets(filter_params),
         'favorites_ids': favorites_ids,
+        'query': query,
+        'image_sizes': IMAGE_CARD_SIZES,
     }
+    if not request.GET.get('cursor'):
+        context['best_sellers'] = CoreService.get_sales_ranking(ProductSalesRanking.MONTH)
+        context['trending'] = CoreService.get_sales_ranking(ProductSalesRanking.WEEK)
     return render(request, "index.html", context)
 
 
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_item_etag, last_modified_func=_item_last_modified)
 def id_item(request, id):
-    item = get_object_or_404(Product, pk=id)
+    try:
+        item = CoreService.get_product(id)
+    except ProductNotFoundError:
+        raise Http404("Product not found")
+    view_counter.increment(item.id)
     
     from favorites.services import FavoriteService
     is_favorite = FavoriteService.is_favorite(request, id)
     
-    return render(request, "phone.html", {'item': item, 'is_favorite': is_favorite})
+    return render(request, "phone.html", {
+        'item': item,
+        'is_favorite': is_favorite,
+        'related_items': CoreService.get_related_products(id),
+        'image_sizes': IMAGE_CARD_SIZES,
+    })
+
+
+@handler_api_errors
+def search(request):
+    """JSON search over the catalog, combinable with the catalog filters"""
+    query = CoreService.extract_search_query(request)
+    if not query:
+        raise ValidationError("Query parameter 'q' is required")
+
+    filter_params = CoreService.extract_filter_params(request)
+    page = CoreService.get_products_page(filter_params, request.GET.get('cursor'), query=query)
+
+    return JsonResponse({
+        'query': query,
+        'results': [
+            {
+                'id': item.id,
+                'name': item.name,
+                'price': item.price,
+                'image': item.image_url,
+                'url': reverse('myapp:id_item', args=[item.id]),
+            }
+            for item in page.items
+        ],
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+    })
+
+
+@handler_api_errors
+@cache_control(public=True, max_age=AUTOCOMPLETE_MAX_AGE)
+def autocomplete(request):
+    """Prefix suggestions over product and category names"""
+    try:
+        limit = min(int(request.GET.get('limit', AUTOCOMPLETE_DEFAULT_LIMIT)), AUTOCOMPLETE_MAX_LIMIT)
+    except ValueError:
+        raise ValidationError("Parameter 'limit' must be an integer")
+
+    suggestions = autocomplete_index.suggest(request.GET.get('q', ''), limit)
+    for suggestion in suggestions:
+        if suggestion['type'] == CATEGORY:
+            suggestion['url'] = reverse('category:products_by_category', args=[suggestion['id']])
+        else:
+            suggestion['url'] = reverse('myapp:id_item', args=[suggestion['id']])
+
+    return JsonResponse({'suggestions': suggestions})
+
+
+@staff_member_required
+def cache_stats(request):
+    """Hit/miss statistics of the process-local catalog caches"""
+    return JsonResponse({
+        'filter_results': filter_result_cache.stats(),
+        'catalog_index': catalog_index.stats(),
+        'snapshot': catalog_snapshot.stats(),
+        'view_counter': view_counter.stats(),
+    })
+
+
+@staff_member_required
+@handler_api_errors
+def export_products(request):
+    """Streams the catalog joined with categories as CSV or JSONL"""
+    file_format = parse_export_format(request.GET.get('format'))
+    columns, rows = product_export_rows(category=request.GET.get('category') or None)
+    return streaming_export_response('products', columns, rows, file_format)
@@ -0,0 +1,39 @@
+from category.services import CategoryService
+from djangoProject.exports import EXPORT_CHUNK_SIZE
+from orders.models import OrderItem
+
+# Export column -> ORM lookup, one row per order line joined with its order and product
+ORDER_EXPORT_FIELDS = {
+    'order_id': 'order_id',
+    'created': 'order__created',
+    'user_id': 'order__user_id',
+    'city': 'order__city',
+    'paid': 'order__paid',
+    'line_id': 'id',
+    'product_id': 'product_id',
+    'product': 'product__name',
+    'category': 'product__category__name',
+    'price': 'price',
+    'quantity': 'quantity',
+}
+
+
+def order_export_rows(start=None, end=None, category=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Streams order lines through a server-side cursor.
+    :param start: Optional aware datetime, inclusive lower bound of Order.created.
+    :param end: Optional aware datetime, exclusive upper bound of Order.created.
+    :param category: Optional category name of the ordered product.
+    :param chunk_size: Rows fetched from the cursor per round trip.
+    :return: Tuple (columns, row iterator).
+    """
+    queryset = OrderItem.objects.order_by('order_id', 'id')
+    if start:
+        queryset = queryset.filter(order__created__gte=start)
+    if end:
+        queryset = queryset.filter(order__created__lt=end)
+    if category:
+        queryset = queryset.filter(product__category_id__in=CategoryService.get_subtree_ids(category))
+
+    rows = queryset.values_list(*ORDER_EXPORT_FIELDS.values()).iterator(chunk_size=chunk_size)
+    return list(ORDER_EXPORT_FIELDS), rows
@@ -9,5 +9,6 @@ urlpatterns = [
     path('create/', views.order_create, name='order_create'),
     path('created/<int:order_id>/', views.order_created, name='order_created'),
     path('info/', views.order_info, name='order_info'),
+    path('export/', views.order_export, name='order_export'),
 ]
 
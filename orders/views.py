@@ -1,9 +1,12 @@
 import logging
 
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
 
 from djangoProject.decorators import handler_api_errors
+from djangoProject.exports import parse_date_range, parse_export_format, streaming_export_response
+from .exports import order_export_rows
 from .services import OrderViewService
 
 
@@ -63,3 +66,13 @@ def order_info(request):
         page_obj = paginator.page(paginator.num_pages)
 
     return render(request, 'orders/profile/info.html', {'page_obj': page_obj})
+
+
+@staff_member_required
+@handler_api_errors
+def order_export(request):
+    """Streams order lines joined with their orders as CSV or JSONL."""
+    file_format = parse_export_format(request.GET.get('format'))
+    start, end = parse_date_range(request.GET.get('date_from'), request.GET.get('date_to'))
+    columns, rows = order_export_rows(start, end, category=request.GET.get('category') or None)
+    return streaming_export_response('orders', columns, rows, file_format)
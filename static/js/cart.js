@@ -2,31 +2,65 @@ document.addEventListener("DOMContentLoaded", function () {
     const buttons = document.querySelectorAll(".add-to-cart");
     const cartCount = document.getElementById("cart-count");
 
+    // Быстрые повторные клики копятся и отправляются одним пакетным запросом
+    const BATCH_DELAY_MS = 400;
+    const pendingAdds = new Map();  // productId -> количество
+    let batchTimer = null;
+
+    function flushAdds() {
+        batchTimer = null;
+        const operations = Array.from(pendingAdds, ([productId, quantity]) => (
+            {op: "add", product_id: productId, quantity: quantity}
+        ));
+        pendingAdds.clear();
+        if (operations.length === 0) {
+            return;
+        }
+
+        fetch("/cart/batch/", {
+            method: "POST",
+            keepalive: true,
+            headers: {
+                "Content-Type": "application/json",
+                "X-CSRFToken": document.cookie.match(/csrftoken=([^;]+)/)[1],
+            },
+            body: JSON.stringify({operations: operations}),
+        })
+            .then((response) => {
+                if (response.status === 401) {
+                    return;
+                }
+                return response.json();
+            })
+            .then((data) => {
+                if (data && data.cart_count !== undefined) {
+                    cartCount.textContent = data.cart_count;  // Обновляем количество в корзине
+                }
+            })
+            .catch(console.error);
+    }
+
     buttons.forEach((button) => {
         button.addEventListener("click", function () {
             const productId = button.getAttribute("data-product-id");
 
-            fetch(`/cart/add/${productId}/`, {
-                method: "POST",
-                headers: {
-                    "Content-Type": "application/json",
-                    "X-CSRFToken": document.cookie.match(/csrftoken=([^;]+)/)[1],
-                },
-            })
-                .then((response) => {
-                    if (response.status === 401) {
-                        return;
-                    }
-                    return response.json();
-                })
-                .then(({cart_count}) => {
-                    if (cart_count !== undefined) {
-                        cartCount.textContent = cart_count;  // Обновляем количество в корзине
-                    }
-                })
-                .catch(console.error);
+            pendingAdds.set(productId, (pendingAdds.get(productId) || 0) + 1);
+            if (cartCount) {
+                cartCount.textContent = (parseInt(cartCount.textContent) || 0) + 1;
+            }
+
+            clearTimeout(batchTimer);
+            batchTimer = setTimeout(flushAdds, BATCH_DELAY_MS);
         });
     });
+
+    // Не теряем клики, если пользователь уходит со страницы до отправки
+    window.addEventListener("pagehide", function () {
+        if (batchTimer) {
+            clearTimeout(batchTimer);
+            flushAdds();
+        }
+    });
 });
 
 document.getElementById('mobile-menu-button').addEventListener('click', function () {
@@ -14,7 +14,61 @@ function getCookie(name) {
     return cookieValue;
 }
 
+// Apply per-user favorite state on top of the shared cached product cards
+function applyFavoritesOverlay() {
+    const favoritesElement = document.getElementById('favorites-ids');
+    if (!favoritesElement) {
+        return;
+    }
+
+    const favoritesIds = new Set(JSON.parse(favoritesElement.textContent).map(String));
+    document.querySelectorAll('.wishlist-button').forEach((button) => {
+        if (favoritesIds.has(button.dataset.productId)) {
+            button.querySelector('.wishlist-icon').src = '/static/images/redWishlist.svg';
+        }
+    });
+}
+
+// Fill the search datalist with name suggestions while the shopper types
+function setupAutocomplete() {
+    const input = document.getElementById('q');
+    const datalist = document.getElementById('q-suggestions');
+    if (!input || !datalist) {
+        return;
+    }
+
+    let timer = null;
+    input.addEventListener('input', function () {
+        clearTimeout(timer);
+        const query = input.value.trim();
+        if (query.length < 2) {
+            datalist.innerHTML = '';
+            return;
+        }
+
+        timer = setTimeout(async function () {
+            try {
+                const url = `${input.dataset.autocompleteUrl}?q=${encodeURIComponent(query)}`;
+                const response = await fetch(url, {credentials: 'same-origin'});
+                const data = await response.json();
+
+                datalist.innerHTML = '';
+                (data.suggestions || []).forEach((suggestion) => {
+                    const option = document.createElement('option');
+                    option.value = suggestion.name;
+                    datalist.appendChild(option);
+                });
+            } catch (error) {
+                console.error('Error loading suggestions:', error);
+            }
+        }, 150);
+    });
+}
+
 document.addEventListener('DOMContentLoaded', function () {
+    applyFavoritesOverlay();
+    setupAutocomplete();
+
     const wishlistButtons = document.querySelectorAll('.wishlist-button');
 
     wishlistButtons.forEach((button) => {